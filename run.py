@@ -1,23 +1,22 @@
 import argparse
+from importlib import import_module
+from pathlib import Path
 from typing import Dict, List, Type
 
 from skye_comlib.utils.logger import Logger
 
-from src.scripts.activity.larry_default_working_day import LarryDefaultWorkingDayScript
-from src.scripts.activity.parse_hayley_export import ParseHayleyExportScript
-from src.scripts.activity.parse_timing_export import ParseTimingExportScript
-from src.scripts.activity.update_calendar import UpdateCalendar
-from src.scripts.location.add_location import AddLocation
-from src.scripts.location.print_locations import PrintLocations
-from src.scripts.location.update_event_times import UpdateEventTimes
-from src.scripts.media.add_episode_to_history import AddEpisodesToHistory
-from src.scripts.media.add_movie_to_history import AddMovieToHistory
-from src.scripts.media.add_to_calendar import AddToCalendar
+from src.connectors.throttle import Throttle
+from src.connectors.transport import FixtureStore
 from src.scripts.script import Script
 
 Logger.configure()
 
 
+def load_script(path: str) -> Type[Script]:
+    module, class_name = path.rsplit(".", 1)
+    return getattr(import_module(module), class_name)
+
+
 def run_multiple(task_dict: dict, tasks_str: str) -> None:
     task_names = list(task_dict.keys())
     if not tasks_str:
@@ -32,30 +31,50 @@ def run_multiple(task_dict: dict, tasks_str: str) -> None:
         else:
             tasks.append(int(number))
     for task in tasks:
-        _script = task_dict[task_names[task]]()
+        _script = load_script(task_dict[task_names[task]])()
         _script.run()
+    Throttle.log_metrics()
+    FixtureStore.log_metrics()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
 
-    FUNCTION_MAP: Dict[str, Type[Script]] = {
-        "Parse timing export": ParseTimingExportScript,  # 0
-        "Update calendar": UpdateCalendar,  # 1
-        "Parse Hayley export": ParseHayleyExportScript,  # 2
-        "Larry default working day": LarryDefaultWorkingDayScript,  # 3
-        "Add Trakt watches to calendar": AddToCalendar,  # 4
-        "Add episodes to history": AddEpisodesToHistory,  # 5
-        "Add movie to history": AddMovieToHistory,  # 6
-        "Update event times": UpdateEventTimes,  # 7
-        "Add new location": AddLocation,  # 8
-        "Print locations": PrintLocations,  # 9
+    FUNCTION_MAP: Dict[str, str] = {
+        "Parse timing export": "src.scripts.activity.parse_timing_export.ParseTimingExportScript",  # 0
+        "Update calendar": "src.scripts.activity.update_calendar.UpdateCalendar",  # 1
+        "Parse Hayley export": "src.scripts.activity.parse_hayley_export.ParseHayleyExportScript",  # 2
+        "Larry default working day": "src.scripts.activity.larry_default_working_day.LarryDefaultWorkingDayScript",  # 3
+        "Add Trakt watches to calendar": "src.scripts.media.add_to_calendar.AddToCalendar",  # 4
+        "Add episodes to history": "src.scripts.media.add_episode_to_history.AddEpisodesToHistory",  # 5
+        "Add movie to history": "src.scripts.media.add_movie_to_history.AddMovieToHistory",  # 6
+        "Update event times": "src.scripts.location.update_event_times.UpdateEventTimes",  # 7
+        "Add new location": "src.scripts.location.add_location.AddLocation",  # 8
+        "Print locations": "src.scripts.location.print_locations.PrintLocations",  # 9
+        "Refresh Google discovery document": "src.scripts.refresh_discovery_document.RefreshDiscoveryDocument",  # 10
+        "Benchmark activity pipeline": "src.scripts.benchmark_activity_pipeline.BenchmarkActivityPipeline",  # 11
+        "Migrate activity files": "src.scripts.activity.migrate_activity_files.MigrateActivityFiles",  # 12
     }
     parser.add_argument("--task", "--t", choices=FUNCTION_MAP.keys(), required=False)
     parser.add_argument("--numbers", "--n", type=str, required=False)
+    parser.add_argument("--profile-startup", action="store_true")
+    parser.add_argument("--transport", choices=["live", "record", "replay"], default="live")
+    parser.add_argument("--fixtures", type=Path, default=FixtureStore.directory)
     args = parser.parse_args()
-    try:
-        script: Script = FUNCTION_MAP[args.task]()
+
+    FixtureStore.configure(args.transport, args.fixtures)
+    if args.transport == "replay":
+        Throttle.limit_rate = False
+
+    if args.profile_startup:
+        from src.startup_profiler import StartupProfiler
+
+        paths = [FUNCTION_MAP[args.task]] if args.task else list(FUNCTION_MAP.values())
+        StartupProfiler.run([path.rsplit(".", 1)[0] for path in paths])
+    elif args.task:
+        script = load_script(FUNCTION_MAP[args.task])()
         script.run()
-    except KeyError:
+        Throttle.log_metrics()
+        FixtureStore.log_metrics()
+    else:
         run_multiple(FUNCTION_MAP, args.numbers)
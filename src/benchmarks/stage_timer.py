@@ -0,0 +1,29 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.results: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        # Stages that run once per day are measured repeatedly: their times add up, their peak memory doesn't
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        start_memory, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            _, peak_memory = tracemalloc.get_traced_memory()
+            result = self.results.setdefault(stage, {"seconds": 0.0, "peak_mb": 0.0})
+            result["seconds"] += seconds
+            result["peak_mb"] = max(result["peak_mb"], (peak_memory - start_memory) / 2**20)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
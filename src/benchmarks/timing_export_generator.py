@@ -0,0 +1,72 @@
+from datetime import datetime, time, timedelta
+from pathlib import Path
+from random import Random
+from typing import List
+
+from dateutil import tz  # type: ignore
+from skye_comlib.utils.file import File
+from skye_comlib.utils.formatter import Formatter
+
+from src.data.data import Data
+
+
+class TimingExportGenerator:
+    export_dir = Path("data/benchmarks/exports")
+    default_location = "järnvägsgatan_41_orsa"
+    first_day = datetime(2020, 1, 1, 7)
+
+    def __init__(self, seed: int = 0):
+        self.random = Random(seed)  # noqa: S311
+
+        self.calendars = [name for name in Data.calendar_dict.keys() if name != "todo"]
+        self.titles = [title for title in Data.icons_dict.keys() if title not in Data.projects_to_ignore + ["Various"]]
+        self.locations = list(Data.geo_location_dict.keys())
+
+    @classmethod
+    def get_export(cls, rows: int, seed: int = 0) -> Path:
+        path = cls.export_dir / f"{rows}_{seed}.csv"
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            File.write_csv(cls(seed).generate(rows), path)
+        return path
+
+    def generate(self, rows: int) -> List[dict]:
+        export = []
+        start = self.first_day
+        calendar, title = self.random.choice(self.calendars), self.random.choice(self.titles)
+        for activity_id in range(rows):
+            # Repeating the previous activity gives merge_short_activities something to do
+            if self.random.random() > 0.4:
+                calendar, title = self.random.choice(self.calendars), self.random.choice(self.titles)
+            duration = timedelta(minutes=self.random.randint(1, 90), seconds=self.random.randint(0, 59))
+            export.append(self.get_row(activity_id, start, duration, calendar, title))
+
+            start += duration + timedelta(minutes=self.random.randint(0, 25))
+            if start.hour >= 23:
+                start = datetime.combine(start.date() + timedelta(days=1), time(7))
+        return export
+
+    def get_row(self, activity_id: int, start: datetime, duration: timedelta, calendar: str, title: str) -> dict:
+        notes = {}
+        time_zone = Data.geo_location_dict[self.default_location].time_zone
+        if self.random.random() < 0.3:
+            notes["location"] = self.random.choice(self.locations)
+            time_zone = Data.geo_location_dict[notes["location"]].time_zone
+
+        projects = [calendar.capitalize(), title]
+        original_title = title
+        if self.random.random() < 0.5:
+            projects.append(self.random.choice(self.titles))
+            original_title = f"Detail {self.random.randint(1, 20)}"
+
+        hours, remainder = divmod(int(duration.total_seconds()), 3600)
+        minutes, seconds = divmod(remainder, 60)
+        return {
+            "ID": activity_id,
+            "Duration": f"{hours:02}:{minutes:02}:{seconds:02}",
+            "Start Date": start.replace(tzinfo=tz.gettz(time_zone)).isoformat(),
+            "End Date": (start + duration).replace(tzinfo=tz.gettz(time_zone)).isoformat(),
+            "Title": original_title,
+            "Notes": Formatter.serialise_details(notes) if notes else "",
+            "Project": " ▸ ".join(projects),
+        }
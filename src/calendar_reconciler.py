@@ -0,0 +1,113 @@
+import logging
+from collections import defaultdict
+from hashlib import sha1
+from typing import Dict, List, Tuple
+
+from src.connectors.google_calendar import GoogleCalBatch
+from src.models.event import Event
+from src.models.event_datetime import EventDateTime
+from src.time_zones import TimeZones
+
+EventKey = Tuple[str, str, str, str, str, str]
+EventSlot = Tuple[str, str, str]
+
+
+class ReconciliationPlan:
+    def __init__(self) -> None:
+        self.inserts: List[Tuple[str, Event]] = []
+        self.updates: List[Tuple[str, Event, Event]] = []
+        self.deletes: List[Tuple[str, Event]] = []
+        self.unchanged: List[Tuple[str, Event]] = []
+
+    def __len__(self) -> int:
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+    def report(self) -> None:
+        for _, event in self.inserts:
+            logging.info(f"[green]+ {CalendarReconciler.describe(event)}", extra={"markup": True})
+        for _, current, desired in self.updates:
+            logging.info(
+                f"[yellow]~ {CalendarReconciler.describe(current)} -> {desired.summary}",
+                extra={"markup": True},
+            )
+        for _, event in self.deletes:
+            logging.info(f"[red]- {CalendarReconciler.describe(event)}", extra={"markup": True})
+        logging.info(
+            f"{len(self.inserts)} to insert, {len(self.updates)} to update, "
+            f"{len(self.deletes)} to delete, {len(self.unchanged)} unchanged.",
+        )
+
+    def apply(self, batch: GoogleCalBatch) -> None:
+        for cal_id, event in self.inserts:
+            batch.create_event(cal_id, event)
+        for cal_id, current, desired in self.updates:
+            batch.update_event(cal_id, current.event_id, desired)
+        for cal_id, event in self.deletes:
+            batch.delete_event(cal_id, event.event_id)
+
+
+class CalendarReconciler:
+    @classmethod
+    def plan(cls, desired: List[Event], current: List[Event]) -> ReconciliationPlan:
+        plan = ReconciliationPlan()
+
+        current_per_key: Dict[EventKey, List[Event]] = defaultdict(list)
+        for event in current:
+            current_per_key[cls.get_key(event)].append(event)
+
+        to_insert: List[Event] = []
+        for event in desired:
+            matches = current_per_key.get(cls.get_key(event))
+            if matches:
+                plan.unchanged.append((cls.get_cal_id(event), matches.pop(0)))
+            else:
+                to_insert.append(event)
+
+        current_per_slot: Dict[EventSlot, List[Event]] = defaultdict(list)
+        for events in current_per_key.values():
+            for event in events:
+                current_per_slot[cls.get_slot(event)].append(event)
+
+        for event in to_insert:
+            matches = current_per_slot.get(cls.get_slot(event))
+            if matches:
+                plan.updates.append((cls.get_cal_id(event), matches.pop(0), event))
+            else:
+                plan.inserts.append((cls.get_cal_id(event), event))
+
+        for events in current_per_slot.values():
+            for event in events:
+                plan.deletes.append((cls.get_cal_id(event), event))
+
+        return plan
+
+    @classmethod
+    def get_key(cls, event: Event) -> EventKey:
+        return (
+            *cls.get_slot(event),
+            event.summary,
+            event.location or "",
+            sha1(event.description.encode()).hexdigest(),  # noqa: S324
+        )
+
+    @classmethod
+    def get_slot(cls, event: Event) -> EventSlot:
+        return cls.get_cal_id(event), cls.to_utc(event.start), cls.to_utc(event.end)
+
+    @staticmethod
+    def get_cal_id(event: Event) -> str:
+        if not event.calendar or not event.owner:
+            raise ValueError(f"Event {event.summary} has no calendar")
+        return event.calendar.get_cal_id(event.owner)
+
+    @staticmethod
+    def to_utc(event_date_time: EventDateTime) -> str:
+        date_time = event_date_time.date_time
+        if not date_time.tzinfo:
+            date_time = date_time.replace(tzinfo=TimeZones.get(event_date_time.time_zone))
+        return date_time.astimezone(TimeZones.utc).isoformat()
+
+    @staticmethod
+    def describe(event: Event) -> str:
+        calendar = event.calendar.name if event.calendar else ""
+        return f"{event.start.date_time.strftime('%Y-%m-%d %H:%M')}: {event.summary} ({calendar})"
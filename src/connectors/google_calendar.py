@@ -1,24 +1,31 @@
 import logging
 import os
+import threading
 import time
 from datetime import date, datetime, time as datetime_time
 from pathlib import Path
-from typing import Dict, List
+from types import TracebackType
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type, Union
 
+import httplib2
+import requests
 from dateutil.relativedelta import relativedelta  # type: ignore
 from google.auth.credentials import Credentials
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import Resource, build, build_from_document
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
 from skye_comlib.utils.file import File
 from skye_comlib.utils.formatter import Formatter
 
+from src.connectors.throttle import Throttle
+from src.connectors.transport import FixtureStore, RecordReplayHttp
 from src.models.calendar import Calendar, Owner
 from src.models.event import Event
 
 logging.getLogger("googleapiclient.discovery_cache").setLevel(logging.ERROR)
-logging.info(Formatter.title("Loading connectors"))
 
 
 def load_credentials(scopes: List[str]) -> Credentials:
@@ -39,9 +46,81 @@ def load_credentials(scopes: List[str]) -> Credentials:
 
 
 class GoogleCalAPI:
-    logging.info("Loading Google Calendar")
     scopes = ["https://www.googleapis.com/auth/calendar"]
-    service = build("calendar", "v3", credentials=load_credentials(scopes))
+    discovery_url = "https://www.googleapis.com/discovery/v1/apis/calendar/v3/rest"
+    discovery_file = Path("data/google/calendar_v3_discovery.json")
+    credentials: Optional[Credentials] = None
+    service: Optional[Resource] = None
+    max_concurrency = 8
+    thread_local = threading.local()
+    # The first calls can come from several threads at once, only one of them should refresh the token
+    lock = threading.RLock()
+    throttle = Throttle("Google Calendar", rate=10, burst=10)
+
+    @classmethod
+    def get_credentials(cls) -> Credentials:
+        if not cls.credentials:
+            with cls.lock:
+                if not cls.credentials:
+                    cls.credentials = load_credentials(cls.scopes)
+        return cls.credentials
+
+    @classmethod
+    def get_service(cls) -> Resource:
+        if not cls.service:
+            with cls.lock:
+                if not cls.service:
+                    cls.service = cls.build_service()
+        return cls.service
+
+    @classmethod
+    def build_service(cls) -> Resource:
+        logging.info("Loading Google Calendar")
+        if cls.discovery_file.exists():
+            return build_from_document(cls.discovery_file.read_text(), http=cls.get_http())
+        logging.warning(f"No discovery document at {cls.discovery_file}, fetching it instead.")
+        return build("calendar", "v3", http=cls.get_http())
+
+    @classmethod
+    def refresh_discovery_document(cls) -> None:
+        response = requests.get(cls.discovery_url, timeout=60)
+        response.raise_for_status()
+        cls.discovery_file.parent.mkdir(parents=True, exist_ok=True)
+        cls.discovery_file.write_text(response.text)
+        cls.service = None
+        logging.info(f"Saved discovery document to {cls.discovery_file}")
+
+    @classmethod
+    def get_http(cls) -> Union[AuthorizedHttp, RecordReplayHttp]:
+        # httplib2 connections are not thread-safe, so every thread gets its own
+        if not hasattr(cls.thread_local, "http"):
+            fixtures = FixtureStore.get("google_calendar")
+            http = None if fixtures.replaying else AuthorizedHttp(cls.get_credentials(), http=httplib2.Http())
+            cls.thread_local.http = RecordReplayHttp(fixtures, http) if fixtures.enabled else http
+        return cls.thread_local.http
+
+    @classmethod
+    def execute(cls, request: HttpRequest, idempotent: Optional[bool] = None) -> Any:
+        retry_server_errors = cls.is_idempotent(request) if idempotent is None else idempotent
+        return cls.throttle.call(
+            lambda: request.execute(http=cls.get_http()),
+            lambda e: cls.get_retry_after(e, retry_server_errors),
+        )
+
+    @staticmethod
+    def is_idempotent(request: HttpRequest) -> bool:
+        return request.method != "POST"
+
+    @staticmethod
+    def get_retry_after(exception: Exception, idempotent: bool = True) -> Optional[float]:
+        # Rate limited requests were never carried out, but after a server error an insert might have gone through
+        if not isinstance(exception, HttpError):
+            return None
+        status = exception.resp.status
+        rate_limited = status == 429 or (status == 403 and "Rate Limit Exceeded" in (exception.reason or ""))
+        if rate_limited or (status >= 500 and idempotent):
+            return Throttle.parse_retry_after(exception.resp.get("retry-after"))
+        return None
 
     @classmethod
     def get_calendars(cls) -> Dict[str, str]:
@@ -59,7 +138,7 @@ class GoogleCalAPI:
             "Christel Ceulemans (Shared met Dirk)",
             "Kevin Shared",
         ]
-        calendar_list = cls.service.calendarList().list().execute().get("items", [])
+        calendar_list = cls.execute(cls.get_service().calendarList().list()).get("items", [])
         calendar_list = {
             Formatter.normalise(calendar.get("summaryOverride"))
             if calendar.get("summaryOverride")
@@ -79,27 +158,45 @@ class GoogleCalAPI:
         time_min: datetime,
         time_max: datetime,
     ) -> List[Event]:
-        try:
-            events = (
-                cls.service.events()
-                .list(
-                    calendarId=calendar.get_cal_id(owner),
-                    timeMin=time_min.isoformat() + "Z",
-                    timeMax=time_max.isoformat() + "Z",
-                    maxResults=max_results,
-                    singleEvents=True,
-                    orderBy="startTime",
-                )
-                .execute()
-                .get("items", [])
-            )
-            return [Event.from_dict(event, calendar, owner) for event in events]
-        except HttpError as e:
-            if e.reason == "Rate Limit Exceeded":
-                logging.error("Rate limit exceeded, trying again in 30s.")
-                time.sleep(30)
-                return cls.get_events(calendar, owner, max_results, time_min, time_max)
-            raise e
+        return list(cls.iter_events(calendar, owner, time_min, time_max, page_size=max_results))
+
+    @classmethod
+    def iter_events(
+        cls,
+        calendar: Calendar,
+        owner: Owner,
+        time_min: datetime,
+        time_max: datetime,
+        page_size: int = 250,
+    ) -> Iterator[Event]:
+        pages = cls.iter_pages(
+            calendarId=calendar.get_cal_id(owner),
+            timeMin=time_min.isoformat() + "Z",
+            timeMax=time_max.isoformat() + "Z",
+            maxResults=page_size,
+            singleEvents=True,
+            orderBy="startTime",
+        )
+        for page in pages:
+            for event in page.get("items", []):
+                yield Event.from_dict(event, calendar, owner)
+
+    @classmethod
+    def get_event_changes(cls, calendar_id: str, sync_token: Optional[str]) -> Tuple[List[dict], str]:
+        items: List[dict] = []
+        for page in cls.iter_pages(calendarId=calendar_id, syncToken=sync_token, maxResults=2500, singleEvents=True):
+            items += page.get("items", [])
+        return items, page["nextSyncToken"]
+
+    @classmethod
+    def iter_pages(cls, **params: Any) -> Iterator[dict]:
+        page_token = None
+        while True:
+            page = cls.execute(cls.get_service().events().list(pageToken=page_token, **params))
+            yield page
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
 
     @classmethod
     def get_all_events_for_day(cls, start: date) -> List[Event]:
@@ -108,74 +205,160 @@ class GoogleCalAPI:
         start = datetime.combine(start, datetime_time(4))
         end = start + relativedelta(days=1)
 
-        return [
-            event
-            for calendar_name, calendar in Data.calendar_dict.items()
-            for owner, cal_id in calendar.get_calendars().items()
-            for event in cls.get_events(calendar, owner, 100, start, end)
+        calendars = [
+            (calendar, owner) for calendar in Data.calendar_dict.values() for owner in calendar.get_calendars().keys()
         ]
+        return Data.event_store.get_events_for_calendars(calendars, start, end)
+
+    @classmethod
+    def batch(cls) -> "GoogleCalBatch":
+        return GoogleCalBatch()
 
     @classmethod
     def delete_event(cls, calendar_id: str, event_id: str) -> None:
-        try:
-            return cls.service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
-        except HttpError as e:
-            if e.reason == "Rate Limit Exceeded":
-                logging.error("Rate limit exceeded, trying again in 30s.")
-                time.sleep(30)
-                return cls.delete_event(calendar_id, event_id)
-            raise e
+        return cls.execute(cls.get_service().events().delete(calendarId=calendar_id, eventId=event_id))
 
     @classmethod
     def create_event(cls, calendar_id: str, event: Event) -> Event:
-        try:
-            return cls.service.events().insert(calendarId=calendar_id, body=event.serialise_for_google()).execute()
-        except HttpError as e:
-            if e.reason == "Rate Limit Exceeded":
-                logging.error("Rate limit exceeded, trying again in 30s.")
-                time.sleep(30)
-                return cls.create_event(calendar_id, event)
-            raise e
+        request = cls.get_service().events().insert(calendarId=calendar_id, body=event.serialise_for_google())
+        return cls.execute(request)
 
     @classmethod
     def update_event(cls, calendar_id: str, event_id: str, event: Event) -> Event:
-        try:
-            return (
-                cls.service.events()
-                .update(
-                    calendarId=calendar_id,
-                    eventId=event_id,
-                    body=event.serialise_for_google(),
-                )
-                .execute()
-            )
-        except HttpError as e:
-            if e.reason == "Rate Limit Exceeded":
-                logging.error("Rate limit exceeded, trying again in 30s.")
-                time.sleep(30)
-                return cls.update_event(calendar_id, event_id, event)
-            raise e
+        return cls.execute(
+            cls.get_service()
+            .events()
+            .update(
+                calendarId=calendar_id,
+                eventId=event_id,
+                body=event.serialise_for_google(),
+            ),
+        )
 
     @classmethod
     def move_event(cls, calendar_id: str, event_id: str, destination: str) -> Event:
-        try:
-            return (
-                cls.service.events().move(calendarId=calendar_id, eventId=event_id, destination=destination).execute()
-            )
-        except HttpError as e:
-            if e.reason == "Rate Limit Exceeded":
-                logging.error("Rate limit exceeded, trying again in 30s.")
-                time.sleep(30)
-                return cls.move_event(calendar_id, event_id, destination)
-            raise e
+        request = cls.get_service().events().move(calendarId=calendar_id, eventId=event_id, destination=destination)
+        return cls.execute(request)
 
     @classmethod
     def get_event_instances(cls, calendar_id: str, event_id: str) -> List[Event]:
-        try:
-            return cls.service.events().instances(calendarId=calendar_id, eventId=event_id).execute()
-        except HttpError as e:
-            if e.reason == "Rate Limit Exceeded":
-                logging.error("Rate limit exceeded, trying again in 30s.")
-                time.sleep(30)
-                return cls.get_event_instances(calendar_id, event_id)
-            raise e
+        return cls.execute(cls.get_service().events().instances(calendarId=calendar_id, eventId=event_id))
+
+
+class BatchOperation:
+    def __init__(self, description: str, request: HttpRequest):
+        self.description = description
+        self.request = request
+
+
+class BatchResult:
+    def __init__(self, operation: BatchOperation, response: Optional[dict], exception: Optional[HttpError]):
+        self.operation = operation
+        self.response = response
+        self.exception = exception
+
+    @property
+    def succeeded(self) -> bool:
+        return self.exception is None
+
+
+class GoogleCalBatch:
+    max_batch_size = 50
+
+    def __init__(self) -> None:
+        self.operations: List[BatchOperation] = []
+        self.results: List[BatchResult] = []
+
+    def __enter__(self) -> "GoogleCalBatch":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        if exc_type:
+            return
+        self.flush()
+        if self.failed:
+            raise GoogleCalBatchError(self.failed)
+
+    @property
+    def failed(self) -> List[BatchResult]:
+        return [result for result in self.results if not result.succeeded]
+
+    def delete_event(self, calendar_id: str, event_id: str) -> None:
+        request = GoogleCalAPI.get_service().events().delete(calendarId=calendar_id, eventId=event_id)
+        self.add(BatchOperation(f"Delete {event_id}", request))
+
+    def create_event(self, calendar_id: str, event: Event) -> None:
+        request = GoogleCalAPI.get_service().events().insert(calendarId=calendar_id, body=event.serialise_for_google())
+        self.add(BatchOperation(f"Create {event.summary}", request))
+
+    def update_event(self, calendar_id: str, event_id: str, event: Event) -> None:
+        request = (
+            GoogleCalAPI.get_service()
+            .events()
+            .update(
+                calendarId=calendar_id,
+                eventId=event_id,
+                body=event.serialise_for_google(),
+            )
+        )
+        self.add(BatchOperation(f"Update {event.summary}", request))
+
+    def add(self, operation: BatchOperation) -> None:
+        self.operations.append(operation)
+        if len(self.operations) >= self.max_batch_size:
+            self.flush()
+
+    def flush(self) -> List[BatchResult]:
+        results: List[BatchResult] = []
+        while self.operations:
+            chunk = self.operations[: self.max_batch_size]
+            self.operations = self.operations[self.max_batch_size :]
+            results += self.execute(chunk)
+
+        for result in results:
+            if result.exception:
+                logging.error(f"{result.operation.description} failed: {result.exception}")
+        self.results += results
+        return results
+
+    def execute(self, operations: List[BatchOperation], attempt: int = 1) -> List[BatchResult]:
+        responses: Dict[str, BatchResult] = {}
+
+        def callback(request_id: str, response: Optional[dict], exception: Optional[HttpError]) -> None:
+            responses[request_id] = BatchResult(operations[int(request_id)], response, exception)
+
+        batch = GoogleCalAPI.get_service().new_batch_http_request(callback=callback)
+        for index, operation in enumerate(operations):
+            batch.add(operation.request, request_id=str(index))
+        GoogleCalAPI.execute(batch, all(GoogleCalAPI.is_idempotent(x.request) for x in operations))
+
+        results = [responses[str(index)] for index in range(len(operations))]
+        to_retry = [
+            result.operation
+            for result in results
+            if result.exception
+            and GoogleCalAPI.get_retry_after(result.exception, GoogleCalAPI.is_idempotent(result.operation.request))
+            is not None
+        ]
+        throttle = GoogleCalAPI.throttle
+        if not to_retry or attempt >= throttle.max_attempts:
+            return results
+
+        delay = throttle.get_backoff(attempt)
+        throttle.metrics.retries += len(to_retry)
+        throttle.metrics.backoff_seconds += delay
+        logging.warning(f"{len(to_retry)} batch operations were throttled, trying again in {delay:.1f}s.")
+        time.sleep(delay)
+        retried = iter(self.execute(to_retry, attempt + 1))
+        return [next(retried) if result.operation in to_retry else result for result in results]
+
+
+class GoogleCalBatchError(Exception):
+    def __init__(self, failed: List[BatchResult]):
+        self.failed = failed
+        super().__init__(f"{len(failed)} Google Calendar batch operations failed.")
@@ -1,17 +1,25 @@
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import psycopg2
 from skye_comlib.utils.file import File
 
+from src.connectors.throttle import Throttle
 from src.models.calendar import Owner
 
 
 class OwnTracks:
-    logging.info("Loading OwnTracks")
-    credentials = File.read_json(Path("src/credentials/own_tracks.json"))
+    credentials: dict = {}
+    throttle = Throttle("OwnTracks", rate=5, burst=5, max_attempts=3)
+
+    @classmethod
+    def get_credentials(cls) -> dict:
+        if not cls.credentials:
+            logging.info("Loading OwnTracks")
+            cls.credentials = File.read_json(Path("src/credentials/own_tracks.json"))
+        return cls.credentials
 
     @classmethod
     def get_records(cls, start: datetime, end: datetime, owner: Owner) -> List[tuple]:
@@ -25,9 +33,17 @@ class OwnTracks:
         )
         query = f"SELECT * FROM public.positions {conditions}"  # noqa: S608
 
-        conn = psycopg2.connect(**cls.credentials)
+        return cls.throttle.call(lambda: cls.fetch_all(query), cls.get_retry_after)
+
+    @classmethod
+    def fetch_all(cls, query: str) -> List[tuple]:
+        conn = psycopg2.connect(**cls.get_credentials())
         cur = conn.cursor()
         cur.execute(query)
         records = cur.fetchall()
         conn.close()
         return records  # noqa: R504
+
+    @staticmethod
+    def get_retry_after(exception: Exception) -> Optional[float]:
+        return 0 if isinstance(exception, psycopg2.OperationalError) else None
@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from random import uniform
+from typing import Callable, ClassVar, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class ThrottleMetrics:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled_seconds = 0.0
+        self.backoff_seconds = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.calls} calls, {self.retries} retries, {self.failures} failures, "
+            f"{self.throttled_seconds:.1f}s throttled, {self.backoff_seconds:.1f}s backing off"
+        )
+
+
+class Throttle:
+    instances: ClassVar[List["Throttle"]] = []
+    limit_rate: ClassVar[bool] = True
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_attempts: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = ThrottleMetrics()
+
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.instances.append(self)
+
+    def acquire(self) -> None:
+        if not self.limit_rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+                self.metrics.throttled_seconds += wait
+            time.sleep(wait)
+
+    def get_backoff(self, attempt: int) -> float:
+        return uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))  # noqa: S311
+
+    def call(self, func: Callable[[], T], get_retry_after: Callable[[Exception], Optional[float]]) -> T:
+        # get_retry_after returns None for errors that should not be retried, and 0 when no wait time is known
+        attempt = 1
+        while True:
+            self.acquire()
+            self.metrics.calls += 1
+            try:
+                return func()
+            except Exception as e:
+                retry_after = get_retry_after(e)
+                if retry_after is None or attempt >= self.max_attempts:
+                    self.metrics.failures += 1
+                    raise e
+                # A Retry-After far in the future is capped, rather than stalling the whole run
+                delay = min(retry_after, self.max_delay) if retry_after else self.get_backoff(attempt)
+                self.metrics.retries += 1
+                self.metrics.backoff_seconds += delay
+                logging.warning(f"{self.name}: {e}. Attempt {attempt} failed, trying again in {delay:.1f}s.")
+                time.sleep(delay)
+                attempt += 1
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> float:
+        # Retry-After holds either seconds or an HTTP date, anything else falls back to the backoff
+        if not value:
+            return 0
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return 0
+            if not retry_at.tzinfo:
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        return seconds if seconds > 0 else 0
+
+    @classmethod
+    def log_metrics(cls) -> None:
+        for throttle in cls.instances:
+            if throttle.metrics.calls:
+                logging.info(f"{throttle.name}: {throttle.metrics}")
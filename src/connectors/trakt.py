@@ -1,17 +1,19 @@
 import logging
 import os
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from json import JSONDecodeError
 from pathlib import Path
-from time import sleep
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pytz  # type: ignore
 import requests
 from requests import Response
+from requests.adapters import HTTPAdapter
 from skye_comlib.utils.file import File
 
+from src.connectors.throttle import Throttle
+from src.connectors.transport import FixtureStore, RecordReplayAdapter
 from src.models.trakt.episode import ExtendedEpisode
 from src.models.trakt.history_item import (
     HistoryItemEpisode,
@@ -26,51 +28,109 @@ from src.models.watch import EpisodeWatch, MovieWatch, Watch
 
 
 class TraktAPI:
-    logging.info("Loading Trakt")
-
     base_url = "https://api.trakt.tv"
     client_id = os.environ.get("TRAKT_CLIENT_ID", "")
-    token = File.read_json(Path("src/credentials/trakt_token.json"))["access_token"]
+    token = ""  # noqa: S105
+    session: Optional[requests.Session] = None
+    pool_size = 10
+    max_concurrency = 4
+    timeout = (10, 60)
+    throttle = Throttle("Trakt", rate=3, burst=10)
+    post_throttle = Throttle("Trakt POST", rate=1, burst=1)
+
+    @classmethod
+    def get_token(cls) -> str:
+        if not cls.token:
+            logging.info("Loading Trakt")
+            if FixtureStore.get("trakt").replaying:
+                return ""
+            cls.token = File.read_json(Path("src/credentials/trakt_token.json"))["access_token"]
+        return cls.token
 
     @classmethod
     def get_headers(cls) -> Dict[str, str]:
         return {
             "Content-Type": "application/json",
-            "Authorization": f"Bearer {cls.token}",
+            "Authorization": f"Bearer {cls.get_token()}",
             "trakt-api-version": "2",
             "trakt-api-key": cls.client_id,
         }
 
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        if not cls.session:
+            session = requests.Session()
+            fixtures = FixtureStore.get("trakt")
+            pool: Dict[str, Any] = {"pool_connections": cls.pool_size, "pool_maxsize": cls.pool_size}
+            adapter = RecordReplayAdapter(fixtures, **pool) if fixtures.enabled else HTTPAdapter(**pool)
+            session.mount("https://", adapter)
+            session.headers.update(cls.get_headers())
+            cls.session = session
+        return cls.session
+
+    @classmethod
+    def send(cls, throttle: Throttle, method: str, url: str, **kwargs: Any) -> Response:
+        def send_once() -> Response:
+            response = cls.get_session().request(method, url, timeout=cls.timeout, **kwargs)
+            # A POST that failed on the server might still have been added, so only rate limited ones are retried
+            if response.status_code == 429 or (response.status_code >= 500 and method != "POST"):
+                raise TraktRetryableError(response)
+            if response.status_code >= 500:
+                raise TraktError(response, url, kwargs)
+            return response
+
+        try:
+            return throttle.call(send_once, cls.get_retry_after)
+        except TraktRetryableError as e:
+            raise TraktError(e.response, url, kwargs)
+
+    @staticmethod
+    def get_retry_after(exception: Exception) -> Optional[float]:
+        if isinstance(exception, TraktRetryableError):
+            return Throttle.parse_retry_after(exception.response.headers.get("Retry-After"))
+        if isinstance(exception, (requests.ConnectionError, requests.Timeout)):
+            return 0
+        return None
+
     @classmethod
     def get_request(cls, url: str, params: Dict[str, Any]) -> dict | List[dict]:
-        response = requests.get(url, headers=cls.get_headers(), params=params, timeout=60)
+        response = cls.send(cls.throttle, "GET", url, params=params)
         try:
             return response.json()
         except JSONDecodeError:
             raise TraktError(response, url, params)
 
     @classmethod
-    def get_request_paginated(cls, url: str, params: dict, page: int = 1) -> List[dict]:
-        params["page"] = page
-        response = requests.get(url, headers=cls.get_headers(), params=params, timeout=60)
+    def get_request_paginated(cls, url: str, params: dict) -> List[dict]:
+        return list(cls.iter_request_paginated(url, params))
+
+    @classmethod
+    def iter_request_paginated(cls, url: str, params: dict) -> Iterator[dict]:
+        results, page_count = cls.get_page(url, params, 1)
+        yield from results
+        if page_count == 1:
+            return
+        with ThreadPoolExecutor(max_workers=cls.max_concurrency) as executor:
+            pages = executor.map(lambda page: cls.get_page(url, params, page)[0], range(2, page_count + 1))
+            for results in pages:
+                yield from results
+
+    @classmethod
+    def get_page(cls, url: str, params: dict, page: int) -> Tuple[List[dict], int]:
+        params = {**params, "page": page}
+        response = cls.send(cls.throttle, "GET", url, params=params)
         try:
             results = response.json()
-            if int(response.headers.get("X-Pagination-Page-Count", 1)) > params["page"]:
-                results += cls.get_request_paginated(url, params, page + 1)
-            return results
         except JSONDecodeError:
             raise TraktError(response, url, params)
+        return results, int(response.headers.get("X-Pagination-Page-Count", 1))
 
     @classmethod
     def post_request(cls, url: str, body: dict) -> dict:
-        response = requests.post(url, headers=cls.get_headers(), json=body, timeout=60)
+        response = cls.send(cls.post_throttle, "POST", url, json=body)
         try:
             return response.json()
         except JSONDecodeError:
-            if response.status_code == 429:
-                logging.warning("Rate limit exceeded, trying again in 30s.")
-                time.sleep(30)
-                return cls.post_request(url, body)
             raise TraktError(response, url, body)
 
     @classmethod
@@ -126,18 +186,29 @@ class TraktAPI:
     @classmethod
     def get_history_for_episode(cls, episode_id: int) -> List[HistoryItemExtendedEpisode]:
         url = f"{cls.base_url}/sync/history/episodes/{episode_id}"
-        response = cls.get_request(url, {"extended": "full"})
+        response = cls.get_request_paginated(url, {"extended": "full"})
         return [HistoryItemExtendedEpisode.model_validate(x) for x in response]
 
     @classmethod
     def get_history_for_movie(cls, movie_id: int) -> List[HistoryItemExtendedMovie]:
         url = f"{cls.base_url}/sync/history/movies/{movie_id}"
-        response = cls.get_request(url, {"extended": "full"})
+        response = cls.get_request_paginated(url, {"extended": "full"})
         return [HistoryItemExtendedMovie.model_validate(x) for x in response]
 
+    @classmethod
+    def get_history_for_episode_ids(cls, episode_ids: Iterable[int]) -> Dict[int, List[HistoryItemExtendedEpisode]]:
+        episode_ids = list(dict.fromkeys(episode_ids))
+        with ThreadPoolExecutor(max_workers=cls.max_concurrency) as executor:
+            return dict(zip(episode_ids, executor.map(cls.get_history_for_episode, episode_ids)))
+
+    @classmethod
+    def get_history_for_movie_ids(cls, movie_ids: Iterable[int]) -> Dict[int, List[HistoryItemExtendedMovie]]:
+        movie_ids = list(dict.fromkeys(movie_ids))
+        with ThreadPoolExecutor(max_workers=cls.max_concurrency) as executor:
+            return dict(zip(movie_ids, executor.map(cls.get_history_for_movie, movie_ids)))
+
     @classmethod
     def add_episodes_to_history(cls, watches: List[Watch]) -> dict:
-        sleep(2)
         url = f"{cls.base_url}/sync/history"
         body = {
             "movies": [
@@ -161,7 +232,6 @@ class TraktAPI:
 
     @classmethod
     def remove_episodes_from_history(cls, watches: List[Watch]) -> dict:
-        sleep(2)
         url = f"{cls.base_url}/sync/history/remove"
         body = {
             "movies": [{"ids": {"trakt": watch.trakt_id}} for watch in watches if isinstance(watch, MovieWatch)],
@@ -186,3 +256,9 @@ class TraktError(Exception):
         File.write_txt(str(response.text).split("\n"), error_file)
         logging.error("\n".join([f"Body: {body}", f"Url: {url}", f"Status code: {response.status_code}"]))
         super().__init__(f"Could not process Trakt request to {url}.")
+
+
+class TraktRetryableError(Exception):
+    def __init__(self, response: Response):
+        self.response = response
+        super().__init__(f"Trakt responded with status code {response.status_code}")
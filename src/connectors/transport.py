@@ -0,0 +1,144 @@
+import atexit
+import logging
+import threading
+import time
+from hashlib import sha1
+from pathlib import Path
+from typing import Any, ClassVar, Dict, List, Optional, Tuple, Union
+
+import httplib2
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from skye_comlib.utils.file import File
+
+
+class FixtureStore:
+    mode: ClassVar[str] = "live"
+    directory: ClassVar[Path] = Path("data/fixtures")
+    stores: ClassVar[Dict[str, "FixtureStore"]] = {}
+
+    def __init__(self, name: str):
+        self.name = name
+        self.file = self.directory / f"{name}.json"
+        self.entries: Dict[str, List[dict]] = File.read_json(self.file) if self.replaying else {}
+        self.calls = 0
+        self.latency = 0.0
+        self.lock = threading.Lock()
+        if self.recording:
+            atexit.register(self.save)
+
+    @classmethod
+    def configure(cls, mode: str, directory: Path) -> None:
+        if mode not in ["live", "record", "replay"]:
+            raise ValueError(f"Unknown transport mode {mode}")
+        cls.mode = mode
+        cls.directory = directory
+
+    @classmethod
+    def get(cls, name: str) -> "FixtureStore":
+        if name not in cls.stores:
+            cls.stores[name] = cls(name)
+        return cls.stores[name]
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "live"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @staticmethod
+    def get_key(method: str, url: str, body: Optional[Union[str, bytes]]) -> str:
+        if isinstance(body, str):
+            body = body.encode()
+        return sha1(method.encode() + b" " + url.encode() + b"\n" + (body or b"")).hexdigest()  # noqa: S324
+
+    def record(self, key: str, status: int, headers: Dict[str, str], content: str, latency: float) -> None:
+        with self.lock:
+            self.entries.setdefault(key, []).append({"status": status, "headers": headers, "content": content})
+            self.calls += 1
+            self.latency += latency
+
+    def replay(self, key: str) -> dict:
+        with self.lock:
+            entries = self.entries.get(key)
+            if not entries:
+                raise FixtureNotFoundError(self.name, key)
+            self.calls += 1
+            # Keep the last response around, so repeated identical requests keep getting an answer
+            return entries.pop(0) if len(entries) > 1 else entries[0]
+
+    def save(self) -> None:
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        File.write_json(self.entries, self.file)
+
+    @classmethod
+    def log_metrics(cls) -> None:
+        for store in cls.stores.values():
+            logging.info(f"{store.name} ({store.mode}): {store.calls} calls, {store.latency:.2f}s waiting on responses")
+
+
+class RecordReplayHttp:
+    def __init__(self, store: FixtureStore, http: Optional[httplib2.Http]):
+        self.store = store
+        self.http = http
+
+    def request(
+        self,
+        uri: str,
+        method: str = "GET",
+        body: Optional[Union[str, bytes]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> Tuple[httplib2.Response, bytes]:
+        # Batch requests use a random multipart boundary, so their body can't be part of the key
+        content_type = (headers or {}).get("content-type", "")
+        key = self.store.get_key(method, uri, None if content_type.startswith("multipart/") else body)
+
+        if self.store.replaying:
+            entry = self.store.replay(key)
+            return httplib2.Response({"status": entry["status"], **entry["headers"]}), entry["content"].encode()
+
+        if not self.http:
+            raise ValueError("No http client to record with")
+        start = time.perf_counter()
+        response, content = self.http.request(uri, method, body=body, headers=headers, **kwargs)
+        headers = {k: v for k, v in response.items() if k != "status"}
+        self.store.record(key, response.status, headers, content.decode(), time.perf_counter() - start)
+        return response, content
+
+
+class RecordReplayAdapter(HTTPAdapter):
+    def __init__(self, store: FixtureStore, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request: PreparedRequest, **kwargs: Any) -> Response:  # type: ignore
+        key = self.store.get_key(request.method or "GET", request.url or "", request.body)
+
+        if self.store.replaying:
+            entry = self.store.replay(key)
+            response = Response()
+            response.status_code = entry["status"]
+            response.headers = CaseInsensitiveDict(entry["headers"])
+            response._content = entry["content"].encode()
+            response.encoding = "utf-8"
+            response.url = request.url or ""
+            response.request = request
+            return response
+
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        self.store.record(key, response.status_code, dict(response.headers), response.text, time.perf_counter() - start)
+        return response
+
+
+class FixtureNotFoundError(Exception):
+    def __init__(self, name: str, key: str):
+        super().__init__(f"No recorded {name} response for request {key}.")
@@ -0,0 +1,83 @@
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.data.activity_file import ActivityFile
+from src.models.activity.activities import Activities
+from src.models.calendar import Owner
+from src.time_zones import TimeZones
+
+
+class ActivityArchive:
+    def __init__(self, owner: Owner):
+        self.archive_file = Path(f"data/activity/{owner.name}/activities.sqlite")
+        self.archive_file.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.archive_file)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS activities ("
+                "day TEXT, position INTEGER, start TEXT, end TEXT, calendar TEXT, title TEXT, payload TEXT, "
+                "PRIMARY KEY (day, position))",
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS activities_start ON activities (start)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS activities_calendar ON activities (calendar, start)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS activities_title ON activities (title, start)")
+
+    def replace_day(self, day: str, activities: Activities) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM activities WHERE day = ?", (day,))
+            self.connection.executemany(
+                "INSERT INTO activities VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        day,
+                        position,
+                        self.to_utc(activity.start.date_time),
+                        self.to_utc(activity.end.date_time),
+                        activity.calendar.name,
+                        activity.title,
+                        json.dumps(ActivityFile.serialise_activity(activity), ensure_ascii=False),
+                    )
+                    for position, activity in enumerate(activities)
+                ],
+            )
+
+    def get_day(self, day: str) -> Activities:
+        return self.get_days(day, day).get(day, Activities())
+
+    def get_days(self, first_day: str, last_day: str) -> Dict[str, Activities]:
+        rows = self.connection.execute(
+            "SELECT day, payload FROM activities WHERE day BETWEEN ? AND ? ORDER BY day, position",
+            (first_day, last_day),
+        )
+        days: Dict[str, Activities] = {}
+        for day, payload in rows:
+            days.setdefault(day, Activities()).append(ActivityFile.deserialise_activity(json.loads(payload)))
+        return days
+
+    def query(
+        self,
+        time_min: datetime,
+        time_max: datetime,
+        calendar: Optional[str] = None,
+        title: Optional[str] = None,
+    ) -> Activities:
+        conditions = ["end > ?", "start < ?"]
+        params: List[str] = [self.to_utc(time_min), self.to_utc(time_max)]
+        if calendar:
+            conditions.append("calendar = ?")
+            params.append(calendar)
+        if title:
+            conditions.append("title = ?")
+            params.append(title)
+        rows = self.connection.execute(
+            f"SELECT payload FROM activities WHERE {' AND '.join(conditions)} ORDER BY start",  # noqa: S608
+            params,
+        )
+        return Activities(ActivityFile.deserialise_activity(json.loads(payload)) for payload, in rows)
+
+    @staticmethod
+    def to_utc(date_time: datetime) -> str:
+        return date_time.astimezone(TimeZones.utc).replace(tzinfo=None).isoformat()
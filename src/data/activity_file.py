@@ -0,0 +1,91 @@
+import gzip
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from src.data.data import Data
+from src.models.activity.activities import Activities
+from src.models.activity.activity import Activity
+from src.models.activity.sub_activity import SubActivity
+from src.models.calendar import Owner
+from src.models.event_datetime import EventDateTime
+from src.models.timing.timing_trajectory import TimingTrajectory
+
+
+class ActivityFile:
+    version = 1
+
+    @staticmethod
+    def get_path(owner_dir: Path, day: str) -> Path:
+        return owner_dir / f"days/{day}.json.gz"
+
+    @staticmethod
+    def get_legacy_path(owner_dir: Path, day: str) -> Path:
+        return owner_dir / f"json/{day}.json"
+
+    @classmethod
+    def write(cls, activities: Activities, path: Path) -> None:
+        content = {"version": cls.version, "activities": [cls.serialise_activity(x) for x in activities]}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(gzip.compress(json.dumps(content, ensure_ascii=False).encode(), compresslevel=6))
+
+    @classmethod
+    def read(cls, path: Path) -> Activities:
+        content = json.loads(gzip.decompress(path.read_bytes()))
+        if content.get("version") != cls.version:
+            raise ValueError(f"Unsupported activity file version {content.get('version')} in {path}")
+        return Activities(cls.deserialise_activity(x) for x in content["activities"])
+
+    @classmethod
+    def serialise_activity(cls, activity: Activity) -> dict:
+        # Locations, calendars and owners are stored by their key and looked up again when reading
+        trajectory = activity.trajectory
+        return {
+            **cls.serialise_sub_activity(activity),
+            "title": activity.title,
+            "calendar": activity.calendar.name,
+            "owner": activity.owner.name,
+            "location": activity.location.label if activity.location else None,
+            "trajectory": [trajectory.origin, trajectory.destination] if trajectory else None,
+            "sub_activities": [cls.serialise_sub_activity(x) for x in activity.sub_activities],
+        }
+
+    @staticmethod
+    def serialise_sub_activity(sub_activity: SubActivity) -> dict:
+        return {
+            "id": sub_activity.activity_id,
+            "projects": sub_activity.projects,
+            "start": [sub_activity.start.date_time.isoformat(), sub_activity.start.time_zone],
+            "end": [sub_activity.end.date_time.isoformat(), sub_activity.end.time_zone],
+        }
+
+    @classmethod
+    def deserialise_activity(cls, content: dict) -> Activity:
+        trajectory: Optional[List[str]] = content["trajectory"]
+        return Activity.model_construct(
+            activity_id=content["id"],
+            projects=content["projects"],
+            start=cls.deserialise_date_time(content["start"]),
+            end=cls.deserialise_date_time(content["end"]),
+            title=content["title"],
+            calendar=Data.calendar_dict[content["calendar"]],
+            owner=Owner[content["owner"]],
+            location=Data.geo_location_dict[content["location"]] if content["location"] else None,
+            trajectory=TimingTrajectory(origin=trajectory[0], destination=trajectory[1]) if trajectory else None,
+            sub_activities=[cls.deserialise_sub_activity(x) for x in content["sub_activities"]],
+        )
+
+    @classmethod
+    def deserialise_sub_activity(cls, content: dict) -> SubActivity:
+        return SubActivity.model_construct(
+            activity_id=content["id"],
+            projects=content["projects"],
+            start=cls.deserialise_date_time(content["start"]),
+            end=cls.deserialise_date_time(content["end"]),
+        )
+
+    @staticmethod
+    def deserialise_date_time(content: List[str]) -> EventDateTime:
+        date_time, time_zone = content
+        return EventDateTime.model_construct(date_time=datetime.fromisoformat(date_time), time_zone=time_zone)
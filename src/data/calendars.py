@@ -3,7 +3,6 @@ from typing import Dict
 
 from skye_comlib.utils.file import File
 
-from src.connectors.google_calendar import GoogleCalAPI
 from src.models.calendar import Calendar
 
 
@@ -19,6 +18,8 @@ class CalendarDict(Dict[str, Calendar]):
             self[name] = Calendar.model_validate(calendar)
 
     def load_from_google(self) -> None:
+        from src.connectors.google_calendar import GoogleCalAPI
+
         calendars = GoogleCalAPI.get_calendars()
         for calendar_name in calendars.keys():
             if not any(calendar_name.endswith(x) for x in ["larry"]):
@@ -1,14 +1,23 @@
+from importlib import import_module
+from typing import TYPE_CHECKING
+
 from src.data.calendars import CalendarDict
 from src.data.geo_locations import GeoLocationDict
 from src.data.icons import IconsDict
+from src.data.lazy import Lazy
 from src.data.runtime_cache import RuntimeCache
 
+if TYPE_CHECKING:
+    from src.data.event_store import EventStore
+
 
 class Data:
-    geo_location_dict: GeoLocationDict = GeoLocationDict()
-    calendar_dict: CalendarDict = CalendarDict()
-    icons_dict: IconsDict = IconsDict()
-    runtime_cache: RuntimeCache = RuntimeCache()
+    geo_location_dict = Lazy(GeoLocationDict)
+    calendar_dict = Lazy(CalendarDict)
+    icons_dict = Lazy(IconsDict)
+    runtime_cache = Lazy(RuntimeCache)
+    # Imported on first use, as it loads the Google Calendar client
+    event_store: Lazy["EventStore"] = Lazy(lambda: import_module("src.data.event_store").EventStore())
 
     projects_to_ignore = [
         "Help people",
@@ -22,28 +31,28 @@ class Data:
 
 
 class GeoLocations:
-    bromsgrove_st = Data.geo_location_dict["bromsgrove_st"]
-    talygarn_st = Data.geo_location_dict["talygarn_st"]
-    jarnvagsgatan = Data.geo_location_dict["järnvägsgatan_41_orsa"]
-    tramshed_tech = Data.geo_location_dict["tramshed_tech"]
-    viola_arena = Data.geo_location_dict["viola_arena"]
+    bromsgrove_st = Lazy(lambda: Data.geo_location_dict["bromsgrove_st"])
+    talygarn_st = Lazy(lambda: Data.geo_location_dict["talygarn_st"])
+    jarnvagsgatan = Lazy(lambda: Data.geo_location_dict["järnvägsgatan_41_orsa"])
+    tramshed_tech = Lazy(lambda: Data.geo_location_dict["tramshed_tech"])
+    viola_arena = Lazy(lambda: Data.geo_location_dict["viola_arena"])
 
 
 class Calendars:
-    chores = Data.calendar_dict["chores"]
-    family = Data.calendar_dict["family"]
-    health = Data.calendar_dict["health"]
-    kids = Data.calendar_dict["kids"]
-    lazing = Data.calendar_dict["lazing"]
-    meetings = Data.calendar_dict["meetings"]
-    music = Data.calendar_dict["music"]
-    projects = Data.calendar_dict["projects"]
-    recreation = Data.calendar_dict["recreation"]
-    school = Data.calendar_dict["school"]
-    shared = Data.calendar_dict["shared"]
-    shared_diary = Data.calendar_dict["shared_diary"]
-    shifts = Data.calendar_dict["shifts"]
-    social = Data.calendar_dict["social"]
-    sports = Data.calendar_dict["sports"]
-    wina = Data.calendar_dict["wina"]
-    work = Data.calendar_dict["work"]
+    chores = Lazy(lambda: Data.calendar_dict["chores"])
+    family = Lazy(lambda: Data.calendar_dict["family"])
+    health = Lazy(lambda: Data.calendar_dict["health"])
+    kids = Lazy(lambda: Data.calendar_dict["kids"])
+    lazing = Lazy(lambda: Data.calendar_dict["lazing"])
+    meetings = Lazy(lambda: Data.calendar_dict["meetings"])
+    music = Lazy(lambda: Data.calendar_dict["music"])
+    projects = Lazy(lambda: Data.calendar_dict["projects"])
+    recreation = Lazy(lambda: Data.calendar_dict["recreation"])
+    school = Lazy(lambda: Data.calendar_dict["school"])
+    shared = Lazy(lambda: Data.calendar_dict["shared"])
+    shared_diary = Lazy(lambda: Data.calendar_dict["shared_diary"])
+    shifts = Lazy(lambda: Data.calendar_dict["shifts"])
+    social = Lazy(lambda: Data.calendar_dict["social"])
+    sports = Lazy(lambda: Data.calendar_dict["sports"])
+    wina = Lazy(lambda: Data.calendar_dict["wina"])
+    work = Lazy(lambda: Data.calendar_dict["work"])
@@ -0,0 +1,38 @@
+from hashlib import sha1
+from pathlib import Path
+from typing import Dict
+
+from skye_comlib.utils.file import File
+
+from src.models.activity.activities import Activities
+from src.models.calendar import Owner
+
+
+class DayManifest:
+    def __init__(self, owner: Owner):
+        self.manifest_file = Path(f"data/activity/{owner.name}/manifest.json")
+        self.days: Dict[str, dict] = File.read_json(self.manifest_file) if self.manifest_file.exists() else {}
+
+    @staticmethod
+    def get_digest(activities: Activities) -> str:
+        # Taken before the day gets merged, so it only depends on the export and the location, calendar and icon data
+        digest = sha1()  # noqa: S324
+        for activity in activities:
+            digest.update(activity.model_dump_json().encode())
+        return digest.hexdigest()
+
+    def has_changed(self, day: str, digest: str) -> bool:
+        return self.days.get(day, {}).get("digest") != digest
+
+    def update(self, day: str, digest: str) -> None:
+        self.days[day] = {"digest": digest, "dirty": True}
+
+    def is_dirty(self, day: str) -> bool:
+        return self.days.get(day, {}).get("dirty", False)
+
+    def mark_clean(self, day: str) -> None:
+        if day in self.days:
+            self.days[day]["dirty"] = False
+
+    def save(self) -> None:
+        File.write_json(self.days, self.manifest_file)
@@ -0,0 +1,103 @@
+import json
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from dateutil import tz  # type: ignore
+from dateutil.parser import parse  # type: ignore
+from googleapiclient.errors import HttpError
+
+from src.connectors.google_calendar import GoogleCalAPI
+from src.models.calendar import Calendar, Owner
+from src.models.event import Event
+
+
+class EventStore:
+    store_file = Path("data/calendar/events.sqlite")
+
+    def __init__(self) -> None:
+        self.synced: Set[str] = set()
+        self.store_file.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.store_file)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "calendar_id TEXT, event_id TEXT, start TEXT, end TEXT, payload TEXT, "
+                "PRIMARY KEY (calendar_id, event_id))",
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS events_start ON events (calendar_id, start)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS sync_tokens (calendar_id TEXT PRIMARY KEY, token TEXT)")
+
+    def get_events(self, calendar: Calendar, owner: Owner, time_min: datetime, time_max: datetime) -> List[Event]:
+        calendar_id = calendar.get_cal_id(owner)
+        self.sync([calendar_id])
+        rows = self.connection.execute(
+            "SELECT payload FROM events WHERE calendar_id = ? AND end > ? AND start < ? ORDER BY start",
+            (calendar_id, time_min.isoformat(), time_max.isoformat()),
+        )
+        return [Event.from_dict(json.loads(payload), calendar, owner) for payload, in rows]
+
+    def get_events_for_calendars(
+        self,
+        calendars: List[Tuple[Calendar, Owner]],
+        time_min: datetime,
+        time_max: datetime,
+        max_concurrency: Optional[int] = None,
+    ) -> List[Event]:
+        self.sync([calendar.get_cal_id(owner) for calendar, owner in calendars], max_concurrency)
+        events = [
+            event for calendar, owner in calendars for event in self.get_events(calendar, owner, time_min, time_max)
+        ]
+        return sorted(events, key=lambda x: x.start.date_time)
+
+    def sync(self, calendar_ids: List[str], max_concurrency: Optional[int] = None) -> None:
+        to_sync = [calendar_id for calendar_id in dict.fromkeys(calendar_ids) if calendar_id not in self.synced]
+        if not to_sync:
+            return
+
+        sync_tokens = [self.get_sync_token(calendar_id) for calendar_id in to_sync]
+        with ThreadPoolExecutor(max_workers=max_concurrency or GoogleCalAPI.max_concurrency) as executor:
+            changes = list(executor.map(self.get_changes, to_sync, sync_tokens))
+
+        with self.connection:
+            for calendar_id, (full_sync, items, sync_token) in zip(to_sync, changes):
+                if full_sync:
+                    self.connection.execute("DELETE FROM events WHERE calendar_id = ?", (calendar_id,))
+                for item in items:
+                    if item.get("status") == "cancelled":
+                        self.connection.execute(
+                            "DELETE FROM events WHERE calendar_id = ? AND event_id = ?",
+                            (calendar_id, item["id"]),
+                        )
+                    else:
+                        start, end = self.to_utc(item["start"]), self.to_utc(item["end"])
+                        self.connection.execute(
+                            "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?)",
+                            (calendar_id, item["id"], start, end, json.dumps(item)),
+                        )
+                self.connection.execute("INSERT OR REPLACE INTO sync_tokens VALUES (?, ?)", (calendar_id, sync_token))
+                self.synced.add(calendar_id)
+
+    @staticmethod
+    def get_changes(calendar_id: str, sync_token: Optional[str]) -> Tuple[bool, List[dict], str]:
+        if sync_token:
+            try:
+                return False, *GoogleCalAPI.get_event_changes(calendar_id, sync_token)
+            except HttpError as e:
+                if e.resp.status != 410:
+                    raise e
+                logging.warning(f"Sync token for {calendar_id} expired, doing a full sync.")
+        return True, *GoogleCalAPI.get_event_changes(calendar_id, None)
+
+    def get_sync_token(self, calendar_id: str) -> Optional[str]:
+        row = self.connection.execute("SELECT token FROM sync_tokens WHERE calendar_id = ?", (calendar_id,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def to_utc(original: dict) -> str:
+        if "dateTime" not in original:
+            return parse(original["date"]).isoformat()
+        return parse(original["dateTime"]).astimezone(tz.UTC).replace(tzinfo=None).isoformat()
@@ -0,0 +1,17 @@
+from typing import Any, Callable, Generic, Optional, Type, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self.name = ""
+
+    def __set_name__(self, owner: Type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Optional[Any], owner: Type) -> T:
+        value = self.factory()
+        setattr(owner, self.name, value)
+        return value
@@ -1,43 +1,144 @@
+import atexit
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict
+from types import TracebackType
+from typing import List, Optional, Type
 
 from skye_comlib.utils.file import File
 
 
 class RuntimeCache:
-    cache_file = Path("data/trakt/cache/runtime.json")
-    shows: Dict[str, Dict[str, Dict[str, dict]]]
-    movies: Dict[str, int]
+    cache_file = Path("data/trakt/cache/runtime.sqlite")
+    legacy_cache_file = Path("data/trakt/cache/runtime.json")
+    flush_interval = 60.0
+    ttl = timedelta(days=30)
 
     def __init__(self) -> None:
         super().__init__()
-        self.load_from_file()
+        self.dirty = False
+        self.last_flush = time.monotonic()
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not self.cache_file.exists()
+        self.connection = sqlite3.connect(self.cache_file)
+        self.create_tables()
+        if is_new and self.legacy_cache_file.exists():
+            self.import_legacy_cache()
+        atexit.register(self.flush)
 
-    def add_movie(self, movie_id: int, runtime: int) -> None:
-        self.movies[str(movie_id)] = runtime
-        self.export_to_file()
+    def __enter__(self) -> "RuntimeCache":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.flush()
+
+    def create_tables(self) -> None:
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS movies ("
+                "movie_id INTEGER PRIMARY KEY, runtime INTEGER, updated_at TEXT, fetched_at TEXT)",
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS seasons ("
+                "show_id INTEGER, season_no INTEGER, updated_at TEXT, fetched_at TEXT, "
+                "PRIMARY KEY (show_id, season_no))",
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS episodes ("
+                "show_id INTEGER, season_no INTEGER, episode_no INTEGER, runtime INTEGER, trakt_id INTEGER, "
+                "title TEXT, PRIMARY KEY (show_id, season_no, episode_no))",
+            )
+
+    def add_movie(self, movie_id: int, runtime: int, updated_at: Optional[datetime] = None) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?)",
+            (movie_id, runtime, updated_at.isoformat() if updated_at else None, datetime.now().isoformat()),
+        )
+        self.mark_dirty()
 
     def get_movie(self, movie_id: int) -> int:
-        return self.movies[str(movie_id)]
+        row = self.connection.execute("SELECT runtime FROM movies WHERE movie_id = ?", (movie_id,)).fetchone()
+        if not row:
+            raise KeyError(movie_id)
+        return row[0]
+
+    def is_movie_stale(self, movie_id: int) -> bool:
+        row = self.connection.execute("SELECT fetched_at FROM movies WHERE movie_id = ?", (movie_id,)).fetchone()
+        return self.is_stale(row[0] if row else None)
+
+    def add_season(self, show_id: int, season_no: int, updated_at: Optional[datetime] = None) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO seasons VALUES (?, ?, ?, ?)",
+            (show_id, season_no, updated_at.isoformat() if updated_at else None, datetime.now().isoformat()),
+        )
+        self.mark_dirty()
+
+    def has_season(self, show_id: int, season_no: int) -> bool:
+        row = self.connection.execute(
+            "SELECT 1 FROM seasons WHERE show_id = ? AND season_no = ?",
+            (show_id, season_no),
+        ).fetchone()
+        return row is not None
+
+    def get_season_updated_at(self, show_id: int, season_no: int) -> Optional[datetime]:
+        row = self.connection.execute(
+            "SELECT updated_at FROM seasons WHERE show_id = ? AND season_no = ?",
+            (show_id, season_no),
+        ).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def get_stale_seasons(self, show_id: int) -> List[int]:
+        rows = self.connection.execute(
+            "SELECT season_no FROM seasons WHERE show_id = ? AND (fetched_at IS NULL OR fetched_at < ?)",
+            (show_id, (datetime.now() - self.ttl).isoformat()),
+        )
+        return [season_no for season_no, in rows]
 
     def add_episode(self, show_id: int, season_no: int, episode_no: int, details: dict) -> None:
-        if str(show_id) not in self.shows:
-            self.shows[str(show_id)] = {}
-        if str(season_no) not in self.shows[str(show_id)]:
-            self.shows[str(show_id)][str(season_no)] = {}
-        self.shows[str(show_id)][str(season_no)][str(episode_no)] = details
-        self.export_to_file()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?, ?, ?)",
+            (show_id, season_no, episode_no, details["runtime"], details["trakt_id"], details["title"]),
+        )
+        self.mark_dirty()
 
     def get_episode(self, show_id: int, season_no: int, episode_no: int) -> dict:
-        return self.shows[str(show_id)][str(season_no)][str(episode_no)]
-
-    def load_from_file(self) -> None:
-        if self.cache_file.exists():
-            content = File.read_json(self.cache_file)
-            self.shows = content.get("shows", {})
-            self.movies = content.get("movies", {})
-        else:
-            self.shows, self.movies = {}, {}
-
-    def export_to_file(self) -> None:
-        File.write_json({"shows": self.shows, "movies": self.movies}, self.cache_file)
+        row = self.connection.execute(
+            "SELECT runtime, trakt_id, title FROM episodes WHERE show_id = ? AND season_no = ? AND episode_no = ?",
+            (show_id, season_no, episode_no),
+        ).fetchone()
+        if not row:
+            raise KeyError((show_id, season_no, episode_no))
+        return {"runtime": row[0], "trakt_id": row[1], "title": row[2]}
+
+    def is_stale(self, fetched_at: Optional[str]) -> bool:
+        return not fetched_at or datetime.fromisoformat(fetched_at) < datetime.now() - self.ttl
+
+    def mark_dirty(self) -> None:
+        self.dirty = True
+        if time.monotonic() - self.last_flush > self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.dirty:
+            self.connection.commit()
+            self.dirty = False
+        self.last_flush = time.monotonic()
+
+    def import_legacy_cache(self) -> None:
+        logging.info(f"Importing {self.legacy_cache_file} into {self.cache_file}")
+        content = File.read_json(self.legacy_cache_file)
+        for movie_id, runtime in content.get("movies", {}).items():
+            self.add_movie(int(movie_id), runtime)
+        for show_id, seasons in content.get("shows", {}).items():
+            for season_no, episodes in seasons.items():
+                self.add_season(int(show_id), int(season_no))
+                for episode_no, details in episodes.items():
+                    self.add_episode(int(show_id), int(season_no), int(episode_no), details)
+        self.flush()
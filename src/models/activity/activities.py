@@ -4,15 +4,15 @@ from collections import defaultdict
 from datetime import timedelta
 from typing import Dict, List
 
-from pytz import timezone  # type: ignore
-
 from src.models.activity.activity import Activity
+from src.models.activity.sub_activity import SubActivity
+from src.models.event_datetime import EventDateTime
 from src.models.location.geo_location import GeoLocation
 
 
 class Activities(List[Activity]):
     def sort_chronically(self) -> None:
-        self.sort(key=lambda x: x.start.date_time.astimezone(timezone("UTC")))
+        self.sort(key=lambda x: x.start.sort_key)
 
     def merge_short_activities(self, max_time_diff: timedelta, default_location: GeoLocation) -> None:
         self.sort_chronically()
@@ -21,56 +21,60 @@ class Activities(List[Activity]):
         for x in self:
             activity_groups[x.title].append(x)
 
+        merged = Activities()
         for group in activity_groups.values():
-            for activity in group:
-                self.remove(activity)
-
-        for activities_to_merge in activity_groups.values():
-            to_merge = []
-            for index, activity in enumerate(activities_to_merge[:-1]):
-                next_activity = activities_to_merge[index + 1]
-                time_diff = next_activity.start.date_time - activity.end.date_time
-                if time_diff > max_time_diff:
-                    continue
-                if activity.owner != next_activity.owner:
-                    continue
-                if activity.calendar != next_activity.calendar:
-                    continue
-                if activity.location and next_activity.location and activity.location != next_activity.location:
-                    continue
-                to_merge.append(index)
-
-            for index in sorted(to_merge, reverse=True):
-                activities_to_merge.merge(index)
-
-            for activity in activities_to_merge:
-                self.append(activity)
+            merged += group.merge_consecutive(max_time_diff)
+        self[:] = merged
 
+        date_times = []
         for activity in self:
             location = activity.location if activity.location else default_location
-            activity.start.time_zone = location.time_zone
-            activity.end.time_zone = location.time_zone
-            activity.start.correct_time_zone()
-            activity.end.correct_time_zone()
-            for sub_activity in activity.sub_activities:
-                sub_activity.start.time_zone = location.time_zone
-                sub_activity.end.time_zone = location.time_zone
-                sub_activity.start.correct_time_zone()
-                sub_activity.end.correct_time_zone()
+            items: List[SubActivity] = [activity, *activity.sub_activities]
+            for item in items:
+                item.start.time_zone = location.time_zone
+                item.end.time_zone = location.time_zone
+                date_times += [item.start, item.end]
+        EventDateTime.correct_time_zones(date_times)
 
         self.sort_chronically()
 
-    def merge(self, index: int) -> None:
+    def merge_consecutive(self, max_time_diff: timedelta) -> "Activities":
+        # Pairs are checked before anything is merged, as merging changes the activities it keeps.
+        # Walking backwards then folds every run of mergeable activities into the activity on its right.
+        mergeable = [self.can_merge(x, y, max_time_diff) for x, y in zip(self, self[1:])]
+        merged = Activities()
+        current = self[-1]
+        for index in range(len(self) - 2, -1, -1):
+            if mergeable[index]:
+                current = self.merge(self[index], current)
+            else:
+                merged.append(current)
+                current = self[index]
+        merged.append(current)
+        merged.reverse()
+        return merged
+
+    @staticmethod
+    def can_merge(activity: Activity, next_activity: Activity, max_time_diff: timedelta) -> bool:
+        if next_activity.start.date_time - activity.end.date_time > max_time_diff:
+            return False
+        if activity.owner != next_activity.owner:
+            return False
+        if activity.calendar != next_activity.calendar:
+            return False
+        if activity.location and next_activity.location and activity.location != next_activity.location:
+            return False
+        return True
+
+    @staticmethod
+    def merge(activity: Activity, next_activity: Activity) -> Activity:
         # TODO: if there are multiple locations, keep the most frequent one when merging
-        next_activity = self.pop(index + 1)
-        activity = self.pop(index)
-
         longest_activity = max([activity, next_activity], key=lambda x: (x.location is not None, x.duration))
 
         longest_activity.sub_activities = activity.sub_activities + next_activity.sub_activities
         longest_activity.start = activity.start
         longest_activity.end = next_activity.end
-        self.insert(index, longest_activity)
+        return longest_activity
 
     def remove_double_activities(self) -> None:
         self.sort_chronically()
@@ -14,8 +14,7 @@ class SubActivity(BaseModel):
     end: EventDateTime
 
     def __str__(self) -> str:
-        self.start.correct_time_zone()
-        self.end.correct_time_zone()
-        period = f"{self.start.date_time.strftime('%H:%M:%S')} - {self.end.date_time.strftime('%H:%M:%S')}"
+        start, end = self.start.corrected_date_time, self.end.corrected_date_time
+        period = f"{start.strftime('%H:%M:%S')} - {end.strftime('%H:%M:%S')}"
         title = " ▸ ".join(self.projects)
         return f"{period}: {title}"
@@ -1,10 +1,12 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import cached_property
+from typing import Any, Iterable, List, Mapping, Optional, Self, Sequence
 
-from dateutil import tz  # type: ignore
 from dateutil.parser import parse  # type: ignore
-from dateutil.relativedelta import relativedelta  # type: ignore
 from pydantic import BaseModel
 
+from src.time_zones import TimeZones
+
 
 class EventDateTime(BaseModel):
     date_time: datetime
@@ -13,17 +15,58 @@ class EventDateTime(BaseModel):
     def __str__(self) -> str:
         return f"{self.date_time} ({self.time_zone})"
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name == "date_time":
+            self.__dict__.pop("sort_key", None)
+
+    def model_copy(self, *, update: Optional[Mapping[str, Any]] = None, deep: bool = False) -> Self:
+        # The update is written to the copy's __dict__ directly, which would keep the cached sort_key
+        copy = super().model_copy(update=update, deep=deep)
+        if update and "date_time" in update:
+            copy.__dict__.pop("sort_key", None)
+        return copy
+
+    @cached_property
+    def sort_key(self) -> int:
+        # Microseconds since the epoch in UTC, cleared whenever date_time changes
+        utc = self.date_time.astimezone(TimeZones.utc).replace(tzinfo=None)
+        return (utc - TimeZones.epoch) // timedelta(microseconds=1)
+
     def serialise_for_google(self) -> dict:
         return {"dateTime": self.date_time.isoformat(), "timeZone": self.time_zone}
 
+    @property
+    def corrected_date_time(self) -> datetime:
+        return self.correct_date_times([self.date_time], [self.time_zone])[0]
+
     def correct_time_zone(self) -> None:
-        date_time_with_tz = self.date_time.replace(tzinfo=tz.gettz(self.time_zone))
-        if self.date_time != date_time_with_tz:
-            hours_neg, minutes_neg, seconds_neg = [int(x) for x in str(self.date_time.utcoffset()).split(":")]
-            self.date_time = self.date_time.replace(tzinfo=tz.gettz(self.time_zone))
-            hours_pos, minutes_pos, seconds_pos = [int(x) for x in str(date_time_with_tz.utcoffset()).split(":")]
-            self.date_time += relativedelta(hours=hours_pos, minutes=minutes_pos, seconds=seconds_pos)
-            self.date_time -= relativedelta(hours=hours_neg, minutes=minutes_neg, seconds=seconds_neg)
+        self.correct_time_zones([self])
+
+    @classmethod
+    def correct_time_zones(cls, event_date_times: Iterable["EventDateTime"]) -> None:
+        event_date_times = list(event_date_times)
+        date_times = [x.date_time for x in event_date_times]
+        time_zones = [x.time_zone for x in event_date_times]
+        for event_date_time, corrected in zip(event_date_times, cls.correct_date_times(date_times, time_zones)):
+            if corrected is not event_date_time.date_time:
+                event_date_time.date_time = corrected
+
+    @staticmethod
+    def correct_date_times(date_times: Sequence[datetime], time_zones: Sequence[str]) -> List[datetime]:
+        # Moves the wall-clock time into the new time zone, shifted by the difference between both UTC offsets.
+        # Date times that are already in their time zone are returned as they are, so correcting twice is a no-op.
+        corrected = []
+        for date_time, time_zone in zip(date_times, time_zones):
+            date_time_with_tz = date_time.replace(tzinfo=TimeZones.get(time_zone))
+            if date_time == date_time_with_tz:
+                corrected.append(date_time)
+            elif date_time.tzinfo is None:
+                corrected.append(date_time_with_tz)
+            else:
+                offset = (date_time_with_tz.utcoffset() or timedelta()) - (date_time.utcoffset() or timedelta())
+                corrected.append(date_time_with_tz + offset)
+        return corrected
 
     @classmethod
     def from_dict(cls, original: dict) -> "EventDateTime":
@@ -1,13 +1,13 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-import pytz  # type: ignore
 from dateutil.relativedelta import relativedelta  # type: ignore
 from pydantic import BaseModel
 from skye_comlib.utils.table_print import TablePrint
 
 from src.data.data import Data
 from src.models.location_timestamp import LocationTimestamp, LocationTimestamps
+from src.time_zones import TimeZones
 
 
 class LocationEvent(BaseModel):
@@ -128,6 +128,6 @@ class LocationEvents(List[LocationEvent]):
 
     @staticmethod
     def ignore_dst(event_time: datetime, time_zone: str) -> datetime:
-        if pytz.timezone(time_zone).dst(event_time) != timedelta():
-            return event_time + pytz.timezone(time_zone).dst(event_time)
+        if TimeZones.get_pytz(time_zone).dst(event_time) != timedelta():
+            return event_time + TimeZones.get_pytz(time_zone).dst(event_time)
         return event_time
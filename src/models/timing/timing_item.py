@@ -1,7 +1,8 @@
 __all__ = ["TimingItem"]
 
 from datetime import datetime, timedelta
-from typing import List, Optional
+from functools import cache, lru_cache
+from typing import Iterable, List, Optional, Tuple
 
 from pydantic import BaseModel, Field, field_validator
 from skye_comlib.utils.formatter import Formatter
@@ -25,21 +26,67 @@ class TimingItem(BaseModel):
     def parse_duration(cls, value: str | timedelta) -> timedelta:
         if isinstance(value, timedelta):
             return value
-        t = datetime.strptime(value, "%H:%M:%S")
-        return timedelta(hours=t.hour, minutes=t.minute, seconds=t.second)
+        return cls.get_duration(value)
 
     @field_validator("notes", mode="before")
     def parse_notes(cls, value: str | TimingNotes) -> TimingNotes:
         if isinstance(value, TimingNotes):
             return value
-        value = Formatter.de_serialise_details(value)
-        return TimingNotes.model_validate(value)
+        return cls.get_notes(value)
 
     @field_validator("all_projects", mode="before")
     def parse_projects(cls, value: str | List[str]) -> List[str]:
         if isinstance(value, list):
             return value
-        return value.split(" ▸ ")
+        return list(cls.get_projects(value))
+
+    @classmethod
+    def from_export(cls, export: Iterable[dict]) -> List["TimingItem"]:
+        # Skips the per-row validators, rows that don't fit this path are validated as usual
+        items = []
+        for row in export:
+            try:
+                values = {
+                    "id": int(row["ID"]),
+                    "duration": cls.get_duration(row["Duration"]),
+                    "start_date": datetime.fromisoformat(row["Start Date"]),
+                    "end_date": datetime.fromisoformat(row["End Date"]),
+                    "original_title": row["Title"],
+                    "notes": cls.get_notes(row["Notes"]),
+                    "all_projects": list(cls.get_projects(row["Project"])),
+                }
+            except (KeyError, TypeError, ValueError):
+                items.append(cls.model_validate(row))
+                continue
+            items.append(cls.from_values(values))
+        return items
+
+    @classmethod
+    def from_values(cls, values: dict) -> "TimingItem":
+        # Sets up the instance the way model_construct does, without its per-field loop over defaults and aliases
+        item = cls.__new__(cls)
+        object.__setattr__(item, "__dict__", values)
+        object.__setattr__(item, "__pydantic_fields_set__", set(values))
+        object.__setattr__(item, "__pydantic_extra__", None)
+        object.__setattr__(item, "__pydantic_private__", None)
+        return item
+
+    @staticmethod
+    @cache
+    def get_duration(value: str) -> timedelta:
+        t = datetime.strptime(value, "%H:%M:%S")
+        return timedelta(hours=t.hour, minutes=t.minute, seconds=t.second)
+
+    @staticmethod
+    @lru_cache(maxsize=16384)
+    def get_notes(value: str) -> TimingNotes:
+        # Notes repeat a lot, the cached instances are shared between items and are never changed
+        return TimingNotes.model_validate(Formatter.de_serialise_details(value))
+
+    @staticmethod
+    @cache
+    def get_projects(value: str) -> Tuple[str, ...]:
+        return tuple(value.split(" ▸ "))
 
     @property
     def projects(self) -> List[str]:
@@ -0,0 +1,48 @@
+import logging
+from pathlib import Path
+from typing import Optional
+
+from skye_comlib.utils.file import File
+from skye_comlib.utils.formatter import Formatter
+from skye_comlib.utils.input import Input
+
+from src.data.activity_archive import ActivityArchive
+from src.data.activity_file import ActivityFile
+from src.models.calendar import Owner
+from src.scripts.activity.activity_script import ActivityScript
+
+
+class MigrateActivityFiles(ActivityScript):
+    def __init__(self, delete_legacy: Optional[bool] = None):
+        super().__init__()
+
+        if delete_legacy is None:
+            delete_legacy = Input.get_bool_input("Delete old files")
+        self.delete_legacy = delete_legacy
+
+    def run(self) -> None:
+        super().run()
+
+        for owner in Owner:
+            owner_dir = Path(f"data/activity/{owner.name}")
+            if not owner_dir.exists():
+                continue
+            logging.info(Formatter.sub_title(owner.name))
+
+            legacy_files = sorted((owner_dir / "json").glob("*.json"))
+            old_size, new_size = 0, 0
+            for legacy_file in legacy_files:
+                path = ActivityFile.get_path(owner_dir, legacy_file.stem)
+                ActivityFile.write(File.read_json_pickle(legacy_file), path)
+                old_size += legacy_file.stat().st_size
+                new_size += path.stat().st_size
+                if self.delete_legacy:
+                    legacy_file.unlink()
+            sizes = f"{old_size / 2**20:.1f} MB > {new_size / 2**20:.1f} MB"
+            logging.info(f"Converted {len(legacy_files)} days, {sizes}.")
+
+            archive = ActivityArchive(owner)
+            day_files = sorted((owner_dir / "days").glob("*.json.gz"))
+            for day_file in day_files:
+                archive.replace_day(day_file.name.removesuffix(".json.gz"), ActivityFile.read(day_file))
+            logging.info(f"[bold pale_green3]Archived {len(day_files)} days.", extra={"markup": True})
@@ -3,12 +3,14 @@ import os
 import re
 from datetime import datetime, time
 from pathlib import Path
+from typing import List
 
 from dateutil.parser import parse  # type: ignore
 from dateutil.relativedelta import relativedelta  # type: ignore
 from skye_comlib.utils.file import File
 from skye_comlib.utils.input import Input
 
+from src.calendar_reconciler import CalendarReconciler
 from src.connectors.google_calendar import GoogleCalAPI
 from src.data.data import Calendars
 from src.models.calendar import Owner
@@ -43,17 +45,22 @@ class ParseHayleyExportScript(ActivityScript):
         self.end = self.start + relativedelta(days=days)
         self.owner = self.get_owner()
         self.location = self.get_location()
+        self.dry_run = Input.get_bool_input("Dry run")
 
     def run(self) -> None:
         super().run()
 
-        events = GoogleCalAPI.get_events(Calendars.chores, Owner.carrie, 1000, self.start, self.end)
-        for event in events:
-            GoogleCalAPI.delete_event(Calendars.chores.carrie, event.event_id)
+        current = GoogleCalAPI.get_events(Calendars.chores, Owner.carrie, 1000, self.start, self.end)
+        plan = CalendarReconciler.plan(self.get_events(), current)
+        plan.report()
+        if self.dry_run:
+            return
 
-        self.create_events()
+        with GoogleCalAPI.batch() as batch:
+            plan.apply(batch)
 
-    def create_events(self) -> None:
+    def get_events(self) -> List[Event]:
+        events = []
         base_dir = Path("data/hayley")
         for file in os.listdir(base_dir):
             if not file.endswith(".csv"):
@@ -86,6 +93,9 @@ class ParseHayleyExportScript(ActivityScript):
                     location=self.location.address.__str__(),
                     start=EventDateTime(date_time=start, time_zone=self.location.time_zone),
                     end=EventDateTime(date_time=end, time_zone=self.location.time_zone),
+                    calendar=Calendars.chores,
+                    owner=Owner.carrie,
                 )
                 logging.info(event.summary)
-                GoogleCalAPI.create_event(Calendars.chores.carrie, event)
+                events.append(event)
+        return events
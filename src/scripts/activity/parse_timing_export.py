@@ -1,25 +1,48 @@
+import csv
 import logging
-from collections import defaultdict
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import timedelta
+from itertools import islice
 from pathlib import Path
-from typing import Dict
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
 
 from dateutil.relativedelta import relativedelta  # type: ignore
 from skye_comlib.utils.file import File
 from skye_comlib.utils.formatter import Formatter
+from skye_comlib.utils.input import Input
 
+from src.data.activity_archive import ActivityArchive
+from src.data.activity_file import ActivityFile
 from src.data.data import Data
+from src.data.day_manifest import DayManifest
 from src.models.activity.activities import Activities
 from src.models.activity.activity import Activity
 from src.models.calendar import Owner
+from src.models.location.geo_location import GeoLocation
 from src.models.timing.timing_item import TimingItem
 from src.scripts.activity.activity_script import ActivityScript
 
 
 class ParseTimingExportScript(ActivityScript):
-    def __init__(self) -> None:
+    max_time_diff = timedelta(minutes=20)
+    chunk_size = 10000
+
+    def __init__(
+        self,
+        streaming: Optional[bool] = None,
+        only_changed: Optional[bool] = None,
+        workers: Optional[int] = None,
+    ):
         super().__init__()
 
+        if streaming is None:
+            streaming = Input.get_bool_input("Streaming")
+        if only_changed is None:
+            only_changed = Input.get_bool_input("Only changed days")
+        self.streaming = streaming
+        self.only_changed = only_changed
+        self.workers: int = workers or Input.get_int_input("Workers", "#workers", 1)
         self.location = Data.geo_location_dict["järnvägsgatan_41_orsa"]
 
     def run(self) -> None:
@@ -28,86 +51,212 @@ class ParseTimingExportScript(ActivityScript):
         for owner in [Owner.carrie]:
             logging.info(Formatter.sub_title(owner.name))
 
-            export = File.read_csv(Path(f"data/activity/{owner.name}/All Activities.csv"))
-            timing_items = [TimingItem.model_validate(item) for item in export]
-
-            all_activities = Activities()
-            for item in timing_items:
-                activity = Activity.from_timing_item(timing_item=item, default_location=self.location, owner=owner)
-                if activity.calendar.name == "todo":
-                    continue
-                if activity.location and "short" not in activity.location.__dict__:
-                    raise Exception(f"No short for {activity.location.address}")
-                all_activities.append(activity)
-
-            activities_per_day: Dict[str, Activities] = defaultdict(Activities)
-            for activity in all_activities:
-                if icon := Data.icons_dict.get(activity.title):
-                    activity.title = f"{icon} {activity.title}"
-                elif activity.title.startswith("Call "):
-                    activity.title = f"📞 {activity.title.replace('Call ', '')}"
-                elif activity.title.startswith("Visit "):
-                    activity.title = f"🏠 {activity.title.replace('Visit ', '')}"
-                elif activity.title.startswith("Birthday "):
-                    activity.title = f"🎂 {activity.title.replace('Birthday ', '')}"
-                elif activity.title.startswith("Haircut "):
-                    activity.title = f"💇 {activity.title.replace('Haircut ', '')}"
-                elif " with " in activity.title:
-                    what, who = activity.title.split(" with ")
-                    icon = Data.icons_dict[what]
-                    who = who[0].upper() + who[1:]
-                    activity.title = f"{icon} {who}"
-                elif activity.title.endswith(" visiting"):
-                    activity.title = f"🏠 {activity.title.replace(' visiting', '')}"
-                else:
-                    raise Exception(f"No icon for {activity.title} - {activity.model_dump(mode='json')}")
-
-                start_day = (activity.start.date_time - relativedelta(hours=4)).strftime("%Y-%m-%d")
-                if not activities_per_day[start_day]:
-                    previous_day = (activity.start.date_time - relativedelta(days=1, hours=4)).strftime("%Y-%m-%d")
-                    if activities_per_day[previous_day]:
-                        last_activity = activities_per_day[previous_day][-1]
-                        last_activity_end = last_activity.end.date_time
-                        if (
-                            last_activity_end + relativedelta(minutes=20) > activity.start.date_time
-                        ) and last_activity.title == activity.title:
-                            activities_per_day[previous_day].append(activity)
-                            continue
-                activities_per_day[start_day].append(activity)
-
-            for day, activities in activities_per_day.items():
-                if not activities:
-                    continue
-
-                activities.merge_short_activities(max_time_diff=timedelta(minutes=20), default_location=self.location)
-                activities.remove_double_activities()
-
-                for activity in activities:
-                    if activity.title == "🚙️ Errands":
-                        if any(sub_activity.projects[0] == "Groceries" for sub_activity in activity.sub_activities):
-                            activity.title = "🛒 Groceries"
-                        elif any(sub_activity.projects[0] == "Shopping" for sub_activity in activity.sub_activities):
-                            activity.title = "🛍️ Shopping"
-                        elif any(sub_activity.projects[-1] == "Bank" for sub_activity in activity.sub_activities):
-                            activity.title = "🏦 Bank"
-                    if (
-                        len(activity.sub_activities) == 1
-                        and len(activity.sub_activities[0].projects) == 1
-                        and activity.title.endswith(activity.sub_activities[0].projects[0])
-                    ):
-                        activity.sub_activities = []
-                    for sub_activity in activity.sub_activities:
-                        if len(sub_activity.projects) > 1:
-                            sub_activity.projects = [x for x in sub_activity.projects if x != "Various"]
-                        if len(sub_activity.projects) > 1 and activity.title.endswith(sub_activity.projects[0]):
-                            sub_activity.projects.pop(0)
-
-                dir_name = Path(f"data/activity/{owner.name}")
-                File.write_csv([x.flatten() for x in activities], dir_name / f"csv/{day}.csv")
-                File.write_json_pickle(activities, dir_name / f"json/{day}.json")
-                logging.info(f"Processed [bold]{day}", extra={"markup": True})
+            owner_dir = Path(f"data/activity/{owner.name}")
+            manifest = DayManifest(owner)
+            archive = ActivityArchive(owner)
+            if self.streaming:
+                days = self.iter_days(owner, owner_dir)
+            else:
+                export = self.read_export(owner_dir / "All Activities.csv")
+                timing_items = self.parse_timing_items(export)
+                days = iter(self.split_per_day(self.get_activities(timing_items, owner)).items())
+            processed = self.flush_days(days, owner_dir, manifest, archive)
+            manifest.save()
 
             logging.info(
-                f"\n[bold pale_green3]Processed {len(activities_per_day) - 1} days.",
+                f"\n[bold pale_green3]Processed {sum(processed)} days, {len(processed) - sum(processed)} unchanged.",
                 extra={"markup": True},
             )
+
+    def iter_days(self, owner: Owner, owner_dir: Path) -> Iterator[Tuple[str, Activities]]:
+        # Needs an export sorted by start date: once an activity lands on a day, all earlier days are complete
+        open_days: Dict[str, Activities] = {}
+        last_closed = ""
+        for chunk in self.iter_export(owner_dir / "All Activities.csv"):
+            for activity in self.get_activities(self.parse_timing_items(chunk), owner):
+                day = self.add_to_day(activity, open_days)
+                if day <= last_closed:
+                    raise Exception(f"Export is not sorted by start date, {day} was already processed")
+                for closed_day in sorted(x for x in open_days if x < day):
+                    yield closed_day, open_days.pop(closed_day)
+                    last_closed = closed_day
+
+        for day in sorted(open_days):
+            yield day, open_days.pop(day)
+
+    def iter_export(self, path: Path) -> Iterator[List[dict]]:
+        with open(path, encoding="utf-8", newline="") as export:
+            reader = csv.DictReader(export)
+            while chunk := list(islice(reader, self.chunk_size)):
+                yield chunk
+
+    def flush_days(
+        self,
+        days: Iterator[Tuple[str, Activities]],
+        owner_dir: Path,
+        manifest: DayManifest,
+        archive: ActivityArchive,
+    ) -> List[bool]:
+        if self.workers == 1:
+            return [self.flush_day(day, activities, owner_dir, manifest, archive) for day, activities in days]
+
+        # Days are logged and added to the manifest and archive in export order, whichever worker finishes first
+        processed = []
+        pending: Deque[Tuple[str, str, Future]] = deque()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for day, activities in days:
+                digest = manifest.get_digest(activities)
+                if not self.has_changed(day, digest, owner_dir, manifest):
+                    processed.append(False)
+                    continue
+                future = executor.submit(self.process_and_write_day, day, activities, owner_dir, self.location)
+                pending.append((day, digest, future))
+                while len(pending) > 2 * self.workers:
+                    day, digest, future = pending.popleft()
+                    processed.append(self.finish_day(day, digest, future.result(), manifest, archive))
+            while pending:
+                day, digest, future = pending.popleft()
+                processed.append(self.finish_day(day, digest, future.result(), manifest, archive))
+        return processed
+
+    def flush_day(
+        self,
+        day: str,
+        activities: Activities,
+        owner_dir: Path,
+        manifest: DayManifest,
+        archive: ActivityArchive,
+    ) -> bool:
+        digest = manifest.get_digest(activities)
+        if not self.has_changed(day, digest, owner_dir, manifest):
+            return False
+
+        activities = self.process_and_write_day(day, activities, owner_dir, self.location)
+        return self.finish_day(day, digest, activities, manifest, archive)
+
+    @staticmethod
+    def finish_day(
+        day: str,
+        digest: str,
+        activities: Activities,
+        manifest: DayManifest,
+        archive: ActivityArchive,
+    ) -> bool:
+        archive.replace_day(day, activities)
+        manifest.update(day, digest)
+        logging.info(f"Processed [bold]{day}", extra={"markup": True})
+        return True
+
+    def has_changed(self, day: str, digest: str, owner_dir: Path, manifest: DayManifest) -> bool:
+        if not self.only_changed:
+            return True
+        return manifest.has_changed(day, digest) or not ActivityFile.get_path(owner_dir, day).exists()
+
+    @classmethod
+    def process_and_write_day(
+        cls,
+        day: str,
+        activities: Activities,
+        directory: Path,
+        location: GeoLocation,
+    ) -> Activities:
+        cls.process_day(activities, location)
+        cls.write_day(day, activities, directory)
+        return activities
+
+    @staticmethod
+    def read_export(path: Path) -> List[dict]:
+        return File.read_csv(path)
+
+    @staticmethod
+    def parse_timing_items(export: List[dict]) -> List[TimingItem]:
+        return TimingItem.from_export(export)
+
+    def get_activities(self, timing_items: List[TimingItem], owner: Owner) -> Activities:
+        all_activities = Activities()
+        for item in timing_items:
+            activity = Activity.from_timing_item(timing_item=item, default_location=self.location, owner=owner)
+            if activity.calendar.name == "todo":
+                continue
+            if activity.location and "short" not in activity.location.__dict__:
+                raise Exception(f"No short for {activity.location.address}")
+            all_activities.append(activity)
+        return all_activities
+
+    def split_per_day(self, all_activities: Activities) -> Dict[str, Activities]:
+        activities_per_day: Dict[str, Activities] = {}
+        for activity in all_activities:
+            self.add_to_day(activity, activities_per_day)
+        return activities_per_day
+
+    def add_to_day(self, activity: Activity, activities_per_day: Dict[str, Activities]) -> str:
+        self.add_icon(activity)
+
+        start_day = (activity.start.date_time - relativedelta(hours=4)).strftime("%Y-%m-%d")
+        if not activities_per_day.get(start_day):
+            previous_day = (activity.start.date_time - relativedelta(days=1, hours=4)).strftime("%Y-%m-%d")
+            if activities_per_day.get(previous_day):
+                last_activity = activities_per_day[previous_day][-1]
+                last_activity_end = last_activity.end.date_time
+                if (
+                    last_activity_end + relativedelta(minutes=20) > activity.start.date_time
+                ) and last_activity.title == activity.title:
+                    activities_per_day[previous_day].append(activity)
+                    return previous_day
+        activities_per_day.setdefault(start_day, Activities()).append(activity)
+        return start_day
+
+    @staticmethod
+    def add_icon(activity: Activity) -> None:
+        if icon := Data.icons_dict.get(activity.title):
+            activity.title = f"{icon} {activity.title}"
+        elif activity.title.startswith("Call "):
+            activity.title = f"📞 {activity.title.replace('Call ', '')}"
+        elif activity.title.startswith("Visit "):
+            activity.title = f"🏠 {activity.title.replace('Visit ', '')}"
+        elif activity.title.startswith("Birthday "):
+            activity.title = f"🎂 {activity.title.replace('Birthday ', '')}"
+        elif activity.title.startswith("Haircut "):
+            activity.title = f"💇 {activity.title.replace('Haircut ', '')}"
+        elif " with " in activity.title:
+            what, who = activity.title.split(" with ")
+            icon = Data.icons_dict[what]
+            who = who[0].upper() + who[1:]
+            activity.title = f"{icon} {who}"
+        elif activity.title.endswith(" visiting"):
+            activity.title = f"🏠 {activity.title.replace(' visiting', '')}"
+        else:
+            raise Exception(f"No icon for {activity.title} - {activity.model_dump(mode='json')}")
+
+    @classmethod
+    def process_day(cls, activities: Activities, location: GeoLocation) -> None:
+        activities.merge_short_activities(max_time_diff=cls.max_time_diff, default_location=location)
+        activities.remove_double_activities()
+        cls.clean_up_titles(activities)
+
+    @staticmethod
+    def clean_up_titles(activities: Activities) -> None:
+        for activity in activities:
+            if activity.title == "🚙️ Errands":
+                if any(sub_activity.projects[0] == "Groceries" for sub_activity in activity.sub_activities):
+                    activity.title = "🛒 Groceries"
+                elif any(sub_activity.projects[0] == "Shopping" for sub_activity in activity.sub_activities):
+                    activity.title = "🛍️ Shopping"
+                elif any(sub_activity.projects[-1] == "Bank" for sub_activity in activity.sub_activities):
+                    activity.title = "🏦 Bank"
+            if (
+                len(activity.sub_activities) == 1
+                and len(activity.sub_activities[0].projects) == 1
+                and activity.title.endswith(activity.sub_activities[0].projects[0])
+            ):
+                activity.sub_activities = []
+            for sub_activity in activity.sub_activities:
+                if len(sub_activity.projects) > 1:
+                    sub_activity.projects = [x for x in sub_activity.projects if x != "Various"]
+                if len(sub_activity.projects) > 1 and activity.title.endswith(sub_activity.projects[0]):
+                    sub_activity.projects.pop(0)
+
+    @staticmethod
+    def write_day(day: str, activities: Activities, directory: Path) -> None:
+        File.write_csv([x.flatten() for x in activities], directory / f"csv/{day}.csv")
+        ActivityFile.write(activities, ActivityFile.get_path(directory, day))
@@ -1,28 +1,46 @@
 import logging
 from datetime import date, datetime, time
 from pathlib import Path
+from typing import List, Optional
 
-import pytz  # type: ignore
 from dateutil.relativedelta import relativedelta  # type: ignore
 from skye_comlib.utils.file import File
 from skye_comlib.utils.formatter import Formatter
 from skye_comlib.utils.input import Input
 
-from src.connectors.google_calendar import GoogleCalAPI
+from src.calendar_reconciler import CalendarReconciler, ReconciliationPlan
+from src.connectors.google_calendar import GoogleCalAPI, GoogleCalBatch
+from src.data.activity_archive import ActivityArchive
+from src.data.activity_file import ActivityFile
 from src.data.data import Calendars, Data, GeoLocations
+from src.data.day_manifest import DayManifest
 from src.models.activity.activities import Activities
 from src.models.activity.activity import Activity
 from src.models.calendar import Owner
 from src.models.event import Event
 from src.scripts.activity.activity_script import ActivityScript
+from src.time_zones import TimeZones
 
 
 class UpdateCalendar(ActivityScript):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        start: Optional[date] = None,
+        days: Optional[int] = None,
+        dry_run: Optional[bool] = None,
+        only_changed: Optional[bool] = None,
+    ):
         super().__init__()
 
-        start = Input.get_date_input("Start")
-        days = Input.get_int_input("Days", "#days")
+        start = start or Input.get_date_input("Start")
+        if not days:
+            days = Input.get_int_input("Days", "#days")
+        if dry_run is None:
+            dry_run = Input.get_bool_input("Dry run")
+        if only_changed is None:
+            only_changed = Input.get_bool_input("Only changed days")
+        self.dry_run = dry_run
+        self.only_changed = only_changed
 
         self.owner = Owner.carrie
         self.work_from_home = True
@@ -33,7 +51,7 @@ class UpdateCalendar(ActivityScript):
 
     def correct_time_offset(self, original: date) -> datetime:
         original_date_time = datetime.combine(original, time(5))
-        date_time_with_tz = original_date_time.astimezone(pytz.timezone(self.location.time_zone))
+        date_time_with_tz = original_date_time.astimezone(TimeZones.get_pytz(self.location.time_zone))
         offset = int(str(date_time_with_tz)[-5:-3])
         return original_date_time - relativedelta(hours=offset)
 
@@ -41,52 +59,86 @@ class UpdateCalendar(ActivityScript):
         logging.info(Formatter.sub_title("Processing"), extra={"markup": True})
 
         owner_dir = Path("data/activity") / self.owner.name
-
-        day = self.start
-        while day < self.end:
-            try:
+        manifest = DayManifest(self.owner)
+        last_day = (self.end - relativedelta(days=1)).strftime("%Y-%m-%d")
+        archived_days = ActivityArchive(self.owner).get_days(self.start.strftime("%Y-%m-%d"), last_day)
+        synced = []
+
+        with GoogleCalAPI.batch() as batch:
+            day = self.start
+            while day < self.end:
                 day_str = day.strftime("%Y-%m-%d")
-                file_name = owner_dir / f"json/{day_str}.json"
-                logging.info(f"[bold]{day_str}", extra={"markup": True})
-                activities = File.read_json_pickle(file_name)
-
-                self.remove_events(day)
-                self.create_events(activities)
-
-            except FileNotFoundError:
-                pass
-
-            day += relativedelta(days=1)
-
-    def remove_events(self, day: datetime) -> None:
-        for calendar in Data.calendar_dict.values():
-            for owner in [self.owner, Owner.shared]:
-                if not calendar.get_cal_id(owner) or calendar == Calendars.shared_diary:
-                    continue
-
-                events = GoogleCalAPI.get_events(calendar, owner, 1000, day, day + relativedelta(days=1))
-                for event in events:
-                    event_day = event.start.date_time - relativedelta(hours=4)
-                    if event_day.day == day.day:
-                        if calendar == Calendars.shared:
-                            GoogleCalAPI.create_event(calendar_id=Calendars.shared_diary.get_cal_id(owner), event=event)
-                        GoogleCalAPI.delete_event(calendar.get_cal_id(owner), event.event_id)
-
-    def create_events(self, activities: Activities) -> None:
+                if not self.only_changed or manifest.is_dirty(day_str):
+                    try:
+                        logging.info(f"[bold]{day_str}", extra={"markup": True})
+                        if day_str not in archived_days:
+                            archived_days[day_str] = self.load_day(owner_dir, day_str)
+                        activities = archived_days[day_str]
+
+                        desired_events = self.get_desired_events(activities)
+                        plan = CalendarReconciler.plan(desired_events, self.get_current_events(day))
+                        plan.report()
+                        if not self.dry_run:
+                            self.archive_shared_events(plan, batch)
+                            plan.apply(batch)
+                            synced.append(day_str)
+
+                    except FileNotFoundError:
+                        pass
+
+                day += relativedelta(days=1)
+
+        # Only reached once the batch went through without failures
+        for day_str in synced:
+            manifest.mark_clean(day_str)
+        manifest.save()
+
+    @staticmethod
+    def load_day(owner_dir: Path, day: str) -> Activities:
+        # Only needed for days that were processed before the archive existed
+        try:
+            return ActivityFile.read(ActivityFile.get_path(owner_dir, day))
+        except FileNotFoundError:
+            legacy_path = ActivityFile.get_legacy_path(owner_dir, day)
+            if not legacy_path.exists():
+                raise
+            logging.warning(f"Reading {legacy_path}, run 'Migrate activity files' to convert it.")
+            return File.read_json_pickle(legacy_path)
+
+    def get_current_events(self, day: datetime) -> List[Event]:
+        calendars = [
+            (calendar, owner)
+            for calendar in Data.calendar_dict.values()
+            for owner in [self.owner, Owner.shared]
+            if calendar.get_cal_id(owner) and calendar != Calendars.shared_diary
+        ]
+        events = Data.event_store.get_events_for_calendars(calendars, day, day + relativedelta(days=1))
+        return [event for event in events if (event.start.date_time - relativedelta(hours=4)).day == day.day]
+
+    @staticmethod
+    def archive_shared_events(plan: ReconciliationPlan, batch: GoogleCalBatch) -> None:
+        # Updated events are archived too, as updating them overwrites what was on the shared calendar
+        replaced = [event for _, event in plan.deletes] + [current for _, current, _ in plan.updates]
+        for event in replaced:
+            if event.calendar == Calendars.shared and event.owner:
+                batch.create_event(calendar_id=Calendars.shared_diary.get_cal_id(event.owner), event=event)
+
+    def get_desired_events(self, activities: Activities) -> List[Event]:
+        events = []
         for activity in activities:
             logging.info(
                 f"{activity.start.date_time.strftime('%H:%M:%S')} - "
                 f"{activity.end.date_time.strftime('%H:%M:%S')}: "
                 f"{activity.title} ({activity.calendar.name})",
             )
-            cal_id = activity.calendar.get_cal_id(activity.owner)
             if activity.sub_activities:
                 sub_activities = "\n".join([x.__str__() for x in activity.sub_activities])
-                self.create_event(cal_id, activity, activity.title, sub_activities)
+                events.append(self.get_event(activity, activity.title, sub_activities))
             else:
-                self.create_event(cal_id, activity, activity.title)
+                events.append(self.get_event(activity, activity.title))
+        return events
 
-    def create_event(self, cal_id: str, activity: Activity, summary: str, description: str = "") -> None:
+    def get_event(self, activity: Activity, summary: str, description: str = "") -> Event:
         if summary in ["Amplyfi", "Lunch"] and not self.work_from_home and not activity.location:
             location = GeoLocations.tramshed_tech.short
         else:
@@ -97,11 +149,12 @@ class UpdateCalendar(ActivityScript):
                 )
             else:
                 location = activity.location.short if activity.location else self.location.short
-        event = Event(
+        return Event(
             summary=summary,
             location=location,
             description=description,
             start=activity.start,
             end=activity.end,
+            calendar=activity.calendar,
+            owner=activity.owner,
         )
-        GoogleCalAPI.create_event(cal_id, event)
@@ -0,0 +1,143 @@
+import logging
+import subprocess  # noqa: S404
+from datetime import date, datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, Optional
+
+from prettytable import PrettyTable
+from skye_comlib.utils.file import File
+from skye_comlib.utils.input import Input
+
+from src.benchmarks.stage_timer import StageTimer
+from src.benchmarks.timing_export_generator import TimingExportGenerator
+from src.models.calendar import Owner
+from src.models.timing.timing_item import TimingItem
+from src.scripts.activity.parse_timing_export import ParseTimingExportScript
+from src.scripts.activity.update_calendar import UpdateCalendar
+from src.scripts.script import Script
+
+
+class BenchmarkActivityPipeline(Script):
+    results_dir = Path("data/benchmarks/activity_pipeline")
+    target_speed_up = 5.0
+
+    def __init__(self, rows: Optional[int] = None):
+        super().__init__()
+
+        self.rows: int = rows or Input.get_int_input("Rows", "#rows", 10000)
+        self.owner = Owner.carrie
+
+    def run(self) -> None:
+        super().run()
+
+        export_file = TimingExportGenerator.get_export(self.rows)
+        parse_script = ParseTimingExportScript(streaming=False, only_changed=False, workers=1)
+        update_calendar = UpdateCalendar(start=date.today(), days=1, dry_run=True, only_changed=False)
+
+        # The pipeline logs every activity it processes, which would drown out the measurements
+        logger = logging.getLogger()
+        level = logger.level
+        logger.setLevel(logging.WARNING)
+        timer = StageTimer()
+        try:
+            with TemporaryDirectory() as directory:
+                with timer.measure("read csv"):
+                    export = parse_script.read_export(export_file)
+                self.clear_caches()
+                with timer.measure("validate timing items"):
+                    timing_items = parse_script.parse_timing_items(export)
+                with timer.measure("validate timing items (per row)"):
+                    [self.validate_per_row(x) for x in export]
+                with timer.measure("build activities"):
+                    activities = parse_script.get_activities(timing_items, self.owner)
+                with timer.measure("split per day"):
+                    activities_per_day = parse_script.split_per_day(activities)
+
+                for day, activities in activities_per_day.items():
+                    with timer.measure("merge short activities"):
+                        activities.merge_short_activities(parse_script.max_time_diff, parse_script.location)
+                    with timer.measure("remove double activities"):
+                        activities.remove_double_activities()
+                    with timer.measure("clean up titles"):
+                        parse_script.clean_up_titles(activities)
+                    with timer.measure("write csv and json"):
+                        parse_script.write_day(day, activities, Path(directory))
+                    with timer.measure("create events"):
+                        update_calendar.get_desired_events(activities)
+        finally:
+            timer.stop()
+            logger.setLevel(level)
+
+        commit = self.get_commit()
+        previous = self.get_previous_result(commit)
+        speed_up = self.get_speed_up(timer.results)
+        File.write_json(
+            {
+                "commit": commit,
+                "date": datetime.now().isoformat(),
+                "rows": self.rows,
+                "stages": timer.results,
+                "speed_up": speed_up,
+            },
+            self.results_dir / f"{self.rows}/{commit}.json",
+        )
+        self.print_results(timer.results, previous)
+
+        message = f"Validating timing items is {speed_up['validate timing items']:.1f}x faster than per row"
+        if speed_up["validate timing items"] < self.target_speed_up:
+            logging.warning(f"[bold red]{message}, the target is {self.target_speed_up:.0f}x.", extra={"markup": True})
+        else:
+            logging.info(f"[bold pale_green3]{message}.", extra={"markup": True})
+
+    @staticmethod
+    def clear_caches() -> None:
+        TimingItem.get_duration.cache_clear()
+        TimingItem.get_notes.cache_clear()
+        TimingItem.get_projects.cache_clear()
+
+    @staticmethod
+    def validate_per_row(row: dict) -> TimingItem:
+        # How every row was parsed before the fast path, with none of the memoised helpers
+        return TimingItem.model_validate(
+            {
+                **row,
+                "Duration": TimingItem.get_duration.__wrapped__(row["Duration"]),
+                "Notes": TimingItem.get_notes.__wrapped__(row["Notes"]),
+                "Project": list(TimingItem.get_projects.__wrapped__(row["Project"])),
+            },
+        )
+
+    @staticmethod
+    def get_speed_up(results: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+        baseline = results["validate timing items (per row)"]["seconds"]
+        return {"validate timing items": baseline / results["validate timing items"]["seconds"]}
+
+    def get_previous_result(self, commit: str) -> Optional[dict]:
+        results = [x for x in (self.results_dir / str(self.rows)).glob("*.json") if x.stem != commit]
+        if not results:
+            return None
+        return File.read_json(max(results, key=lambda x: x.stat().st_mtime))
+
+    @staticmethod
+    def print_results(results: Dict[str, Dict[str, float]], previous: Optional[dict]) -> None:
+        table = PrettyTable(align="l")
+        table.field_names = ["STAGE", "TIME (s)", "PEAK (MB)", f"PREVIOUS (s) {previous['commit'] if previous else ''}"]
+        for stage, result in results.items():
+            before = previous["stages"].get(stage) if previous else None
+            change = ""
+            if before and before["seconds"]:
+                change = f"{before['seconds']:.3f} ({result['seconds'] / before['seconds'] - 1:+.0%})"
+            table.add_row([stage, f"{result['seconds']:.3f}", f"{result['peak_mb']:.1f}", change])
+        print(table)
+        print(f"Total time: {sum(x['seconds'] for x in results.values()):.3f} s")
+
+    @staticmethod
+    def get_commit() -> str:
+        result = subprocess.run(  # noqa: S603, S607
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return result.stdout.strip()
@@ -1,26 +1,30 @@
 import logging
 from abc import ABC
-from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from random import randint, shuffle
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from dateutil.relativedelta import relativedelta  # type: ignore
 from skye_comlib.utils.formatter import Formatter
 
-from src.connectors.google_calendar import GoogleCalAPI
+from src.connectors.google_calendar import GoogleCalAPI, GoogleCalBatch
 from src.connectors.trakt import TraktAPI
 from src.data.data import Calendars, Data
+from src.data.lazy import Lazy
 from src.models.calendar import Calendar, Owner
 from src.models.event import Event
 from src.models.event_datetime import EventDateTime
 from src.models.location.geo_location import GeoLocation
+from src.models.trakt.episode import ExtendedEpisode
 from src.models.trakt.history_item import HistoryItemEpisode, HistoryItemMovie
+from src.models.trakt.season import ExtendedSeason
 from src.models.watch import EpisodeWatch, MovieWatch, TempEpisodeWatch, TempMovieWatch, Watch
 from src.scripts.script import Script
 
 
 class MediaScript(Script, ABC):
-    calendar = Calendars.lazing
+    calendar = Lazy(lambda: Calendars.lazing)
 
     @classmethod
     def process_watches(
@@ -40,24 +44,30 @@ class MediaScript(Script, ABC):
 
         logging.info("Adding watch events to Google Calendar")
 
-        for watch in watches:
-            logging.info(f"- {watch.__str__()} {watch.get_start()} - {watch.end}")
-            cls.create_watch_event(calendar, owner, watch, location)
+        with GoogleCalAPI.batch() as batch:
+            for watch in watches:
+                logging.info(f"- {watch.__str__()} {watch.get_start()} - {watch.end}")
+                cls.create_watch_event(batch, calendar, owner, watch, location)
 
     @classmethod
     def remove_watches_from_history(cls, watches: List[Watch]) -> None:
+        episode_history = TraktAPI.get_history_for_episode_ids(
+            watch.episode_id for watch in watches if isinstance(watch, EpisodeWatch)
+        )
+        movie_history = TraktAPI.get_history_for_movie_ids(
+            watch.trakt_id for watch in watches if isinstance(watch, MovieWatch)
+        )
+
         add_again: List[Watch] = []
         for watch in watches:
             if isinstance(watch, EpisodeWatch):
-                results = TraktAPI.get_history_for_episode(watch.episode_id)
-                for result in results:
+                for result in episode_history[watch.episode_id]:
                     old_watch = TempEpisodeWatch.from_result(result)
                     if abs(old_watch.watched_at - watch.end).days > 5:
                         runtime = cls.get_episode_runtime(watch.trakt_id, watch.season_no, watch.episode_no)
                         add_again.append(EpisodeWatch(old_watch, runtime))
             elif isinstance(watch, MovieWatch):
-                results = TraktAPI.get_history_for_movie(watch.trakt_id)
-                for result in results:
+                for result in movie_history[watch.trakt_id]:
                     old_watch = TempMovieWatch.from_result(result)
                     if abs(old_watch.watched_at - watch.end).days > 5:
                         runtime = cls.get_movie_runtime(watch.trakt_id)
@@ -94,28 +104,100 @@ class MediaScript(Script, ABC):
 
     @classmethod
     def get_episode_details(cls, show_id: int, season_no: int, episode_no: int) -> dict:
-        # TODO there's an issue if the season is already in the cache but the data has been updated
+        if season_no in Data.runtime_cache.get_stale_seasons(show_id):
+            cls.refresh_stale_seasons(show_id)
         try:
             return Data.runtime_cache.get_episode(show_id, season_no, episode_no)
 
         except KeyError:
-            results = TraktAPI.get_season_details(show_id, season_no)
+            season = cls.get_seasons(show_id).get(season_no)
+            cls.cache_season(show_id, season_no, season.updated_at if season else None)
+            return Data.runtime_cache.get_episode(show_id, season_no, episode_no)
 
-            for result in results:
-                cache_entry = {"runtime": result.runtime, "trakt_id": result.ids.trakt, "title": result.title}
-                Data.runtime_cache.add_episode(show_id, season_no, result.number, cache_entry)
+    @classmethod
+    def prefetch_runtimes(
+        cls,
+        episode_history: List[HistoryItemEpisode],
+        movie_history: List[HistoryItemMovie],
+    ) -> None:
+        seasons = {(result.show.ids.trakt, result.episode.season) for result in episode_history}
+        missing_seasons = [season for season in seasons if not Data.runtime_cache.has_season(*season)]
+        stale_shows = {
+            show_id for show_id, season_no in seasons if season_no in Data.runtime_cache.get_stale_seasons(show_id)
+        }
+        shows = sorted(stale_shows | {show_id for show_id, _ in missing_seasons})
+        movies = {result.movie.ids.trakt for result in movie_history}
+        missing_movies = [movie_id for movie_id in movies if Data.runtime_cache.is_movie_stale(movie_id)]
+        if not shows and not missing_movies:
+            return
+
+        logging.info(f"Prefetching {len(shows)} shows and {len(missing_movies)} movies")
+        with ThreadPoolExecutor(max_workers=TraktAPI.max_concurrency) as executor:
+            movie_details = executor.map(TraktAPI.get_movie, missing_movies)
+            # Trakt's updated_at is stored with the season, so it is only fetched again once it changed
+            show_seasons = dict(zip(shows, executor.map(cls.get_seasons, shows)))
+
+            to_fetch: Dict[Tuple[int, int], Optional[datetime]] = {}
+            for show_id in sorted(stale_shows):
+                for season_no, updated_at in cls.get_outdated_seasons(show_id, show_seasons[show_id]).items():
+                    to_fetch[show_id, season_no] = updated_at
+            for show_id, season_no in missing_seasons:
+                season = show_seasons[show_id].get(season_no)
+                to_fetch[show_id, season_no] = season.updated_at if season else None
+
+            season_details = executor.map(lambda x: TraktAPI.get_season_details(*x), to_fetch)
+            for (show_id, season_no), results in zip(to_fetch, season_details):
+                cls.store_season(show_id, season_no, results, to_fetch[show_id, season_no])
+            for movie_id, movie in zip(missing_movies, movie_details):
+                Data.runtime_cache.add_movie(movie_id, movie.runtime, movie.updated_at)
 
-            return Data.runtime_cache.get_episode(show_id, season_no, episode_no)
+    @classmethod
+    def cache_season(cls, show_id: int, season_no: int, updated_at: Optional[datetime] = None) -> None:
+        cls.store_season(show_id, season_no, TraktAPI.get_season_details(show_id, season_no), updated_at)
+
+    @staticmethod
+    def store_season(
+        show_id: int,
+        season_no: int,
+        results: List[ExtendedEpisode],
+        updated_at: Optional[datetime] = None,
+    ) -> None:
+        for result in results:
+            cache_entry = {"runtime": result.runtime, "trakt_id": result.ids.trakt, "title": result.title}
+            Data.runtime_cache.add_episode(show_id, season_no, result.number, cache_entry)
+        Data.runtime_cache.add_season(show_id, season_no, updated_at)
+
+    @staticmethod
+    def get_seasons(show_id: int) -> Dict[int, ExtendedSeason]:
+        return {season.number: season for season in TraktAPI.get_seasons(str(show_id))}
+
+    @classmethod
+    def refresh_stale_seasons(cls, show_id: int) -> None:
+        for season_no, updated_at in cls.get_outdated_seasons(show_id, cls.get_seasons(show_id)).items():
+            logging.info(f"Refreshing season {season_no} of show {show_id}")
+            cls.cache_season(show_id, season_no, updated_at)
+
+    @staticmethod
+    def get_outdated_seasons(show_id: int, seasons: Dict[int, ExtendedSeason]) -> Dict[int, Optional[datetime]]:
+        # Stale seasons that did not change on Trakt are marked as fresh, the others are returned with their updated_at
+        outdated = {}
+        for season_no in Data.runtime_cache.get_stale_seasons(show_id):
+            season = seasons.get(season_no)
+            cached_updated_at = Data.runtime_cache.get_season_updated_at(show_id, season_no)
+            if not season or (cached_updated_at and season.updated_at and cached_updated_at >= season.updated_at):
+                Data.runtime_cache.add_season(show_id, season_no, cached_updated_at)
+            else:
+                outdated[season_no] = season.updated_at
+        return outdated
 
     @classmethod
     def get_movie_runtime(cls, movie_id: int) -> int:
-        try:
+        if not Data.runtime_cache.is_movie_stale(movie_id):
             return Data.runtime_cache.get_movie(movie_id)
 
-        except KeyError:
-            result = TraktAPI.get_movie(movie_id)
-            Data.runtime_cache.add_movie(movie_id, result.runtime)
-            return result.runtime
+        result = TraktAPI.get_movie(movie_id)
+        Data.runtime_cache.add_movie(movie_id, result.runtime, result.updated_at)
+        return result.runtime
 
     @classmethod
     def spread_watches(cls, watches: List[Watch], duration: timedelta) -> List[Watch]:
@@ -135,14 +217,25 @@ class MediaScript(Script, ABC):
 
         return watches
 
+    @classmethod
+    def create_watch_event(
+        cls,
+        batch: GoogleCalBatch,
+        calendar: Calendar,
+        owner: Owner,
+        watch: Watch,
+        location: GeoLocation,
+    ) -> None:
+        batch.create_event(calendar.get_cal_id(owner), cls.get_watch_event(calendar, owner, watch, location))
+
     @staticmethod
-    def create_watch_event(calendar: Calendar, owner: Owner, watch: Watch, location: GeoLocation) -> None:
-        event = Event(
+    def get_watch_event(calendar: Calendar, owner: Owner, watch: Watch, location: GeoLocation) -> Event:
+        return Event(
             summary=watch.title,
             location=location.address.__str__(),
             description=Formatter.serialise_details(watch.details),
             start=EventDateTime(date_time=watch.get_start(), time_zone=location.time_zone),
             end=EventDateTime(date_time=watch.end, time_zone=location.time_zone),
+            calendar=calendar,
+            owner=owner,
         )
-
-        GoogleCalAPI.create_event(calendar.get_cal_id(owner), event)
@@ -0,0 +1,9 @@
+from src.connectors.google_calendar import GoogleCalAPI
+from src.scripts.script import Script
+
+
+class RefreshDiscoveryDocument(Script):
+    def run(self) -> None:
+        super().run()
+
+        GoogleCalAPI.refresh_discovery_document()
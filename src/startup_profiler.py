@@ -0,0 +1,34 @@
+import subprocess  # noqa: S404
+import sys
+from typing import List, Tuple
+
+from prettytable import PrettyTable
+
+
+class StartupProfiler:
+    @classmethod
+    def run(cls, modules: List[str], limit: int = 25) -> None:
+        timings = cls.get_import_times(modules)
+        table = PrettyTable(align="l")
+        table.field_names = ["MODULE", "SELF (ms)", "CUMULATIVE (ms)"]
+        for module, self_time, cumulative in sorted(timings, key=lambda x: x[2], reverse=True)[:limit]:
+            table.add_row([module, f"{self_time / 1000:.1f}", f"{cumulative / 1000:.1f}"])
+        print(table)
+        print(f"Total import time: {sum(x[1] for x in timings) / 1000:.1f} ms")
+
+    @staticmethod
+    def get_import_times(modules: List[str]) -> List[Tuple[str, int, int]]:
+        statement = "; ".join(f"import {module}" for module in modules)
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-X", "importtime", "-c", statement],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_time, cumulative, module = line.removeprefix("import time:").split("|")
+            timings.append((module.strip(), int(self_time), int(cumulative)))
+        return timings
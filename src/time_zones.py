@@ -0,0 +1,21 @@
+from datetime import datetime, tzinfo
+from functools import cache
+from typing import Optional
+
+import pytz  # type: ignore
+from dateutil import tz  # type: ignore
+
+
+class TimeZones:
+    utc = tz.UTC
+    epoch = datetime(1970, 1, 1)
+
+    @staticmethod
+    @cache
+    def get(name: str) -> Optional[tzinfo]:
+        return tz.gettz(name)
+
+    @staticmethod
+    @cache
+    def get_pytz(name: str) -> pytz.BaseTzInfo:
+        return pytz.timezone(name)
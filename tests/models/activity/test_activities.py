@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+from random import Random
+from typing import Dict, List
+
+import pytest
+from dateutil import tz  # type: ignore
+from dateutil.relativedelta import relativedelta  # type: ignore
+
+from src.models.activity.activities import Activities
+from src.models.activity.activity import Activity
+from src.models.activity.sub_activity import SubActivity
+from src.models.calendar import Calendar, Owner
+from src.models.event_datetime import EventDateTime
+from src.models.location.address.address import Address
+from src.models.location.geo_location import GeoLocation
+from src.time_zones import TimeZones
+
+MAX_TIME_DIFF = timedelta(minutes=20)
+
+
+def get_location(label: str, time_zone: str) -> GeoLocation:
+    address = Address(country_code=time_zone[:2].upper(), country=time_zone.split("/")[-1])
+    return GeoLocation.model_construct(time_zone=time_zone, category="home", label=label, short=label, address=address)
+
+
+DEFAULT_LOCATION = get_location("home", "Europe/Stockholm")
+LOCATIONS = [None, DEFAULT_LOCATION, get_location("office", "Europe/Stockholm"), get_location("away", "Europe/London")]
+CALENDARS = [Calendar(name=name, carrie=name, larry="", shared="") for name in ["lazing", "work", "social"]]
+TITLES = ["📺 TV", "💻 Work", "🍽️ Dinner", "🚶 Walk"]
+GAPS = [0, 1, 5, 19, 20, 21, 30, 90]
+
+
+def get_activities(seed: int) -> Activities:
+    generator = Random(seed)  # noqa: S311
+    activities = Activities()
+    start = datetime(2023, 3, 25, 8, tzinfo=TimeZones.get(generator.choice(["Europe/Stockholm", "UTC"])))
+    for activity_id in range(generator.randint(1, 40)):
+        start += timedelta(minutes=generator.choice(GAPS))
+        end = start + timedelta(minutes=generator.randint(1, 90))
+        location = generator.choice(LOCATIONS)
+        time_zone = (location or DEFAULT_LOCATION).time_zone
+        # Sub-activities share their start and end with the activity, as they do when built from a timing item
+        start_date_time = EventDateTime(date_time=start, time_zone=time_zone)
+        end_date_time = EventDateTime(date_time=end, time_zone=time_zone)
+        sub_activities = []
+        if generator.random() < 0.7:
+            projects = generator.sample(["Various", "TV", "Groceries", "Bank"], generator.randint(1, 2))
+            sub_activities.append(
+                SubActivity(activity_id=activity_id, projects=projects, start=start_date_time, end=end_date_time),
+            )
+        activities.append(
+            Activity(
+                activity_id=activity_id,
+                projects=[],
+                start=start_date_time,
+                end=end_date_time,
+                title=generator.choice(TITLES),
+                calendar=generator.choice(CALENDARS),
+                owner=Owner.carrie if generator.random() < 0.9 else Owner.larry,
+                location=location,
+                trajectory=None,
+                sub_activities=sub_activities,
+            ),
+        )
+        start = end
+    generator.shuffle(activities)
+    return activities
+
+
+def correct_time_zone_reference(event_date_time: EventDateTime) -> None:
+    # The time zone correction from before the UTC offsets were subtracted directly
+    date_time_with_tz = event_date_time.date_time.replace(tzinfo=tz.gettz(event_date_time.time_zone))
+    if event_date_time.date_time != date_time_with_tz:
+        hours_neg, minutes_neg, seconds_neg = [int(x) for x in str(event_date_time.date_time.utcoffset()).split(":")]
+        event_date_time.date_time = event_date_time.date_time.replace(tzinfo=tz.gettz(event_date_time.time_zone))
+        hours_pos, minutes_pos, seconds_pos = [int(x) for x in str(date_time_with_tz.utcoffset()).split(":")]
+        event_date_time.date_time += relativedelta(hours=hours_pos, minutes=minutes_pos, seconds=seconds_pos)
+        event_date_time.date_time -= relativedelta(hours=hours_neg, minutes=minutes_neg, seconds=seconds_neg)
+
+
+def merge_short_activities_reference(
+    activities: Activities,
+    max_time_diff: timedelta,
+    default_location: GeoLocation,
+) -> Activities:
+    # The implementation merge_short_activities replaced, which removed and inserted every merged pair in place
+    def merge(group: List[Activity], index: int) -> None:
+        next_activity = group.pop(index + 1)
+        activity = group.pop(index)
+        longest_activity = max([activity, next_activity], key=lambda x: (x.location is not None, x.duration))
+        longest_activity.sub_activities = activity.sub_activities + next_activity.sub_activities
+        longest_activity.start = activity.start
+        longest_activity.end = next_activity.end
+        group.insert(index, longest_activity)
+
+    activities = Activities(sorted(activities, key=lambda x: x.start.date_time.astimezone(TimeZones.utc)))
+
+    activity_groups: Dict[str, List[Activity]] = {}
+    for x in activities:
+        activity_groups.setdefault(x.title, []).append(x)
+
+    result = Activities()
+    for group in activity_groups.values():
+        to_merge = []
+        for index, activity in enumerate(group[:-1]):
+            next_activity = group[index + 1]
+            if next_activity.start.date_time - activity.end.date_time > max_time_diff:
+                continue
+            if activity.owner != next_activity.owner:
+                continue
+            if activity.calendar != next_activity.calendar:
+                continue
+            if activity.location and next_activity.location and activity.location != next_activity.location:
+                continue
+            to_merge.append(index)
+
+        for index in sorted(to_merge, reverse=True):
+            merge(group, index)
+        result += group
+
+    for activity in result:
+        location = activity.location if activity.location else default_location
+        for x in [activity, *activity.sub_activities]:
+            x.start.time_zone = location.time_zone
+            x.end.time_zone = location.time_zone
+            correct_time_zone_reference(x.start)
+            correct_time_zone_reference(x.end)
+
+    return Activities(sorted(result, key=lambda x: x.start.date_time.astimezone(TimeZones.utc)))
+
+
+def describe(event_date_time: EventDateTime) -> tuple:
+    return event_date_time.date_time, event_date_time.date_time.utcoffset(), event_date_time.time_zone
+
+
+def describe_activity(activity: Activity) -> tuple:
+    sub_activities = [(x.activity_id, x.projects, describe(x.start), describe(x.end)) for x in activity.sub_activities]
+    location = activity.location.label if activity.location else None
+    start, end = describe(activity.start), describe(activity.end)
+    return activity.activity_id, activity.title, location, start, end, sub_activities
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_merge_short_activities_matches_reference(seed: int) -> None:
+    activities = get_activities(seed)
+    activities.merge_short_activities(MAX_TIME_DIFF, DEFAULT_LOCATION)
+
+    expected = merge_short_activities_reference(get_activities(seed), MAX_TIME_DIFF, DEFAULT_LOCATION)
+
+    assert [describe_activity(x) for x in activities] == [describe_activity(x) for x in expected]